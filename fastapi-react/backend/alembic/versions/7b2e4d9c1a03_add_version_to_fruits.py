@@ -0,0 +1,28 @@
+"""Add version column to fruits
+
+Revision ID: 7b2e4d9c1a03
+Revises: ca55ae22f61d
+Create Date: 2026-10-17 10:12:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e4d9c1a03'
+down_revision: Union[str, Sequence[str], None] = 'ca55ae22f61d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('fruits', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('fruits', 'version')
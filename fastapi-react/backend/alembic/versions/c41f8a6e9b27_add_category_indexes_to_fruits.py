@@ -0,0 +1,30 @@
+"""Add category indexes to fruits
+
+Revision ID: c41f8a6e9b27
+Revises: 7b2e4d9c1a03
+Create Date: 2026-10-17 11:03:27.904115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41f8a6e9b27'
+down_revision: Union[str, Sequence[str], None] = '7b2e4d9c1a03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_fruits_category', 'fruits', ['category'], unique=False)
+    op.create_index('ix_fruits_name_category', 'fruits', ['name', 'category'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_fruits_name_category', table_name='fruits')
+    op.drop_index('ix_fruits_category', table_name='fruits')
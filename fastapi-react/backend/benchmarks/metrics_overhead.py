@@ -0,0 +1,57 @@
+"""Measure the per-request cost of MetricsMiddleware.
+
+Drives a trivial ASGI app directly (no server, no HTTP parsing) with and
+without the middleware and reports the difference per request:
+
+    python -m benchmarks.metrics_overhead --requests 200000
+"""
+import argparse
+import asyncio
+import time
+
+from metrics import MetricsMiddleware
+
+class _Route:
+    path = "/fruits"
+
+async def bare_app(scope, receive, send):
+    # Mimic the router: the matched route is written back into the scope
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+async def send(message):
+    pass
+
+async def drive(app, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app({"type": "http", "method": "GET", "path": "/fruits"}, receive, send)
+    return time.perf_counter() - start
+
+async def run(requests: int, rounds: int):
+    instrumented = MetricsMiddleware(bare_app)
+    # Warm up label children and the interpreter
+    await drive(instrumented, 1000)
+    await drive(bare_app, 1000)
+
+    bare = min([await drive(bare_app, requests) for _ in range(rounds)])
+    with_metrics = min([await drive(instrumented, requests) for _ in range(rounds)])
+    overhead_us = (with_metrics - bare) / requests * 1e6
+    print(f"\n📏 MetricsMiddleware overhead ({requests} requests, best of {rounds})")
+    print(f"   Bare app:      {bare / requests * 1e6:.2f}µs/request")
+    print(f"   With metrics:  {with_metrics / requests * 1e6:.2f}µs/request")
+    print(f"   Overhead:      {overhead_us:.2f}µs/request")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.rounds))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Latency of GET /fruits/search's prefix index against catalogue size.
+
+Run from the backend directory:
+
+    python -m benchmarks.prefix_search --sizes 10000 100000 1000000
+
+Measures the index alone (no HTTP, no database): build time, query
+latency for random 1-4 character prefixes, and the cost of the
+in-place insert/remove a write event triggers.
+"""
+import argparse
+import asyncio
+import random
+import string
+import time
+
+from prefix_index import PrefixIndex
+
+def make_names(size: int) -> list:
+    rng = random.Random(size)
+    return [
+        ("".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12))) + f"-{i}", f"category-{i % 50}")
+        for i in range(size)
+    ]
+
+def percentile(sorted_times: list, p: float) -> float:
+    return sorted_times[min(len(sorted_times) - 1, int(len(sorted_times) * p / 100))]
+
+async def run(size: int, queries: int, limit: int):
+    names = make_names(size)
+
+    async def load():
+        return names
+
+    index = PrefixIndex(load, max_age=0)
+    start = time.perf_counter()
+    await index.search("a", limit)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(0)
+    prefixes = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(1, 4))) for _ in range(queries)]
+    times = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        await index.search(prefix, limit)
+        times.append((time.perf_counter() - start) * 1_000_000)
+    times.sort()
+
+    writes = []
+    for i in range(min(queries, 1000)):
+        # Random names land anywhere in the array, so the list shift is realistic
+        name = f"{rng.choice(string.ascii_lowercase)}-new-{i}"
+        start = time.perf_counter()
+        index.apply(add=[(name, None)])
+        index.apply(remove=[name])
+        writes.append((time.perf_counter() - start) * 1_000_000 / 2)
+    writes.sort()
+
+    print(
+        f"   {size:>9} names  build {build_ms:9.1f}ms  "
+        f"search p50 {percentile(times, 50):6.1f}µs  p99 {percentile(times, 99):6.1f}µs  p99.9 {percentile(times, 99.9):6.1f}µs  "
+        f"write p50 {percentile(writes, 50):8.1f}µs"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefix search latency vs catalogue size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+    print(f"🔎 Prefix search, limit {args.limit}, {args.queries} random 1-4 character prefixes")
+    for size in args.sizes:
+        asyncio.run(run(size, args.queries, args.limit))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compare the model path and the pre-rendered path for GET /fruits hits.
+
+Run from the backend directory:
+
+    python -m benchmarks.response_render --sizes 100 1000 10000
+"""
+import argparse
+import os
+import statistics
+import time
+
+# main imports database.py, which requires a URL; nothing is queried here
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from main import Fruit, Fruits
+from rendering import render_model
+
+def make_fruit_list(size: int) -> list:
+    # Mix in missing categories and non-ASCII names so the byte comparison means something
+    return [
+        {"name": f"fruit-{i}" if i % 13 else f"pêche-{i}", "category": f"category-{i % 20}"} if i % 7 else {"name": f"fruit-{i}"}
+        for i in range(size)
+    ]
+
+def time_it(fn, iterations: int) -> dict:
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "avg_time_ms": statistics.mean(times),
+        "median_time_ms": statistics.median(times),
+        "min_time_ms": min(times),
+    }
+
+def run(size: int, iterations: int):
+    fruit_list = make_fruit_list(size)
+    body = render_model(Fruits(fruits=[Fruit(**f) for f in fruit_list]))
+
+    app = FastAPI()
+
+    # What a hit used to cost: build the models, then let FastAPI validate
+    # and encode them again through response_model
+    @app.get("/model", response_model=Fruits)
+    async def model_route():
+        return Fruits(fruits=[Fruit(**f) for f in fruit_list])
+
+    # The fast path: return the body stored at cache-fill time
+    @app.get("/raw", response_model=Fruits)
+    async def raw_route():
+        return Response(content=body, media_type="application/json")
+
+    with TestClient(app) as client:
+        model_body = client.get("/model").content
+        raw_body = client.get("/raw").content
+        assert model_body == raw_body, "pre-rendered body differs from the response_model output"
+        model = time_it(lambda: client.get("/model"), iterations)
+        raw = time_it(lambda: client.get("/raw"), iterations)
+
+    print(f"\n📦 {size} fruits ({len(body) / 1024:.1f} KiB) - bodies identical ✅")
+    print(f"   Model path:        {model['median_time_ms']:.3f}ms median ({model['avg_time_ms']:.3f}ms avg)")
+    print(f"   Pre-rendered path: {raw['median_time_ms']:.3f}ms median ({raw['avg_time_ms']:.3f}ms avg)")
+    print(f"   Speedup: {model['median_time_ms'] / raw['median_time_ms']:.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.iterations)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""Hermetic benchmark suite: drives main.app in-process, no server needed.
+
+The app runs behind httpx's ASGI transport on a throwaway SQLite database,
+with fakeredis standing in for Redis (``pip install -r requirements-dev.txt``) unless
+``--redis-url`` points at a real redis-server. Every route is timed with a
+cold cache (flushed before each request) and a warm one, at each seed size.
+
+Run from the backend directory:
+
+    python -m benchmarks.suite                          # compare to baseline
+    python -m benchmarks.suite --update-baseline        # record a new baseline
+    python -m benchmarks.suite --sizes 100 10000 1000000 --threshold 0.15
+
+Exits with status 1 when any timing regresses past ``--threshold`` against
+the baseline file. Baselines are machine-specific: record them on the
+machine (or CI runner class) that will run the comparison.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+
+# database.py reads the URL at import time, so it must be set before main is imported
+_workdir = tempfile.mkdtemp(prefix="fruits-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'bench.db')}"
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+SEED_CHUNK_SIZE = 10000
+# Rows per POST /fruits/bulk request
+BULK_CASE_ROWS = 500
+
+def use_redis(redis_url: Optional[str]):
+    """Point the async Redis client at ``redis_url``, or at fakeredis."""
+    if redis_url:
+        # Read by connect() when the app starts
+        os.environ["REDIS_URL"] = redis_url
+        return
+    import redis_client
+
+    try:
+        import fakeredis
+    except ImportError:
+        sys.exit("fakeredis is not installed: pip install -r requirements-dev.txt, or pass --redis-url")
+    server = fakeredis.FakeServer()
+
+    def from_url(url, **kwargs):
+        kwargs.pop("max_connections", None)
+        return fakeredis.FakeAsyncRedis(server=server, **kwargs).connection_pool
+
+    redis_client.aioredis.ConnectionPool.from_url = staticmethod(from_url)
+
+def seed(size: int):
+    """Replace the fruits table with ``size`` generated rows."""
+    from sqlalchemy import delete, insert
+    from database import Fruit, engine
+
+    with engine.begin() as connection:
+        connection.execute(delete(Fruit))
+        for start in range(0, size, SEED_CHUNK_SIZE):
+            rows = [
+                {"name": f"fruit-{i:07d}", "category": f"category-{i % 50}" if i % 7 else None}
+                for i in range(start, min(start + SEED_CHUNK_SIZE, size))
+            ]
+            connection.execute(insert(Fruit), rows)
+
+async def flush_cache():
+    from redis_client import async_redis_client
+
+    await async_redis_client.redis_client.flushdb()
+    if async_redis_client.local_cache is not None:
+        async_redis_client.local_cache.clear()
+
+@dataclass
+class Case:
+    """One timed request. ``setup``/``teardown`` run outside the timing."""
+    name: str
+    request: Callable[..., Awaitable]
+    setup: Optional[Callable[..., Awaitable]] = None
+    teardown: Optional[Callable[..., Awaitable]] = None
+    expected_status: int = 200
+
+async def _etag(client, i):
+    return (await client.get("/fruits")).headers["etag"]
+
+async def _new_name(client, i):
+    return f"bench-{i}"
+
+async def _create(client, i):
+    name = await _new_name(client, i)
+    await client.post("/fruits", json={"name": name, "category": "bench"})
+    return name
+
+async def _remove(client, name):
+    await client.delete(f"/fruits/{name}")
+
+async def _bulk_rows(client, i):
+    return [{"name": f"bench-bulk-{i}-{row}", "category": "bench"} for row in range(BULK_CASE_ROWS)]
+
+async def _remove_bulk(client, rows):
+    from sqlalchemy import delete
+    from database import Fruit, engine
+
+    # One statement instead of a DELETE request per row; the cache is
+    # flushed since nothing invalidated it
+    with engine.begin() as connection:
+        connection.execute(delete(Fruit).where(Fruit.name.in_([row["name"] for row in rows])))
+    await flush_cache()
+
+def build_cases(size: int) -> list:
+    middle = size // 2
+    return [
+        Case("GET /fruits", lambda client, ctx: client.get("/fruits")),
+        Case("GET /fruits?limit=50", lambda client, ctx: client.get("/fruits", params={"limit": 50})),
+        Case("GET /fruits?limit=50&after=mid", lambda client, ctx: client.get("/fruits", params={"limit": 50, "after": middle})),
+        Case("GET /fruits (ndjson)", lambda client, ctx: client.get("/fruits", headers={"accept": "application/x-ndjson"})),
+        Case(
+            "GET /fruits (If-None-Match)",
+            lambda client, ctx: client.get("/fruits", headers={"if-none-match": ctx}),
+            setup=_etag,
+            expected_status=304,
+        ),
+        Case(
+            "POST /fruits",
+            lambda client, ctx: client.post("/fruits", json={"name": ctx, "category": "bench"}),
+            setup=_new_name,
+            teardown=_remove,
+        ),
+        Case(
+            "PUT /fruits/{name}",
+            lambda client, ctx: client.put(f"/fruits/{ctx}", json={"name": ctx, "category": "bench-updated"}),
+            setup=_create,
+            teardown=_remove,
+        ),
+        Case("DELETE /fruits/{name}", lambda client, ctx: client.delete(f"/fruits/{ctx}"), setup=_create),
+        Case(
+            f"POST /fruits/bulk ({BULK_CASE_ROWS} rows)",
+            lambda client, ctx: client.post("/fruits/bulk", json=ctx),
+            setup=_bulk_rows,
+            teardown=_remove_bulk,
+        ),
+    ]
+
+async def time_case(client, case: Case, warm: bool, iterations: int, warmup: int) -> dict:
+    times = []
+    for i in range(warmup + iterations):
+        if not warm:
+            await flush_cache()
+        ctx = await case.setup(client, i) if case.setup else None
+        if warm:
+            # Writes invalidate the cached views: refill them before every run
+            await client.get("/fruits")
+            await client.get("/fruits", params={"limit": 50})
+        start = time.perf_counter()
+        response = await case.request(client, ctx)
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code != case.expected_status:
+            raise RuntimeError(f"{case.name}: expected {case.expected_status}, got {response.status_code}")
+        if case.teardown:
+            await case.teardown(client, ctx)
+        if i >= warmup:
+            times.append(elapsed)
+    times.sort()
+    return {
+        "iterations": iterations,
+        "median_ms": statistics.median(times),
+        "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))],
+        "min_ms": times[0],
+    }
+
+async def run_suite(sizes: list, iterations: int, warmup: int) -> Dict[str, dict]:
+    import httpx
+    from database import Base, engine
+    import main
+
+    Base.metadata.create_all(bind=engine)
+    results = {}
+    # ASGITransport does not send lifespan events, so run the app's lifespan here
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for size in sizes:
+                print(f"\n🌱 Seeding {size} fruits...")
+                seed(size)
+                # Fewer timed runs where one request moves the whole table
+                runs = max(3, iterations // 10) if size >= 1_000_000 else iterations
+                for case in build_cases(size):
+                    for state in ("cold", "warm"):
+                        result = await time_case(client, case, state == "warm", runs, warmup)
+                        results[f"{size}/{case.name}/{state}"] = result
+                        print(f"   {case.name:<34} {state:<5} median {result['median_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms")
+    return results
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float, min_delta_ms: float) -> list:
+    """Return the keys whose median regressed past ``threshold``.
+
+    Differences under ``min_delta_ms`` are ignored so sub-millisecond noise
+    on fast routes can't fail the run.
+    """
+    regressions = []
+    print(f"\n📊 Against baseline (threshold {threshold:.0%}, min delta {min_delta_ms}ms)")
+    for key, result in results.items():
+        if key not in baseline:
+            print(f"   {key:<60} new")
+            continue
+        before, after = baseline[key]["median_ms"], result["median_ms"]
+        change = (after - before) / before if before else 0.0
+        regressed = change > threshold and after - before > min_delta_ms
+        marker = "❌" if regressed else "✅"
+        print(f"   {marker} {key:<58} {before:8.2f}ms -> {after:8.2f}ms ({change:+.1%})")
+        if regressed:
+            regressions.append(key)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process benchmark suite with regression gating")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000], help="Seed sizes (add 1000000 for the large run)")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown as a fraction (0.2 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5)
+    parser.add_argument("--output", help="Also write this run's results to a JSON file")
+    parser.add_argument("--redis-url", help="Use a real redis-server instead of fakeredis")
+    args = parser.parse_args()
+
+    use_redis(args.redis_url)
+    results = asyncio.run(run_suite(args.sizes, args.iterations, args.warmup))
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "redis": args.redis_url or "fakeredis",
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\n⚠️ No baseline at {args.baseline} - run with --update-baseline to record one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) past {args.threshold:.0%}")
+        sys.exit(1)
+    print("\n✅ No regressions")
+
+if __name__ == "__main__":
+    main()
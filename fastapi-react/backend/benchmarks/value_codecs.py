@@ -0,0 +1,63 @@
+"""Encode/decode time and stored size of each cache codec on fruit lists.
+
+Run from the backend directory:
+
+    python -m benchmarks.value_codecs --sizes 100 1000 10000
+
+Codecs whose optional package (orjson, msgpack, zstandard, lz4) is not
+installed are skipped.
+"""
+import argparse
+import statistics
+import time
+
+from cache_codecs import COMPRESSORS, SERIALIZERS, CacheCodec
+
+CATEGORIES = ["berry", "citrus", "pome", "drupe", "tropical", "melon"]
+
+def make_fruit_list(size: int) -> list:
+    # Shaped like a cached GET /fruits entry: an envelope around the rows
+    return {
+        "v": {
+            "fruits": [
+                {"id": i, "name": f"fruit-{i}", "category": CATEGORIES[i % len(CATEGORIES)] if i % 7 else None}
+                for i in range(size)
+            ]
+        },
+        "fresh_until": time.time() + 3600,
+    }
+
+def median_ms(fn, iterations: int) -> float:
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+def run(size: int, iterations: int):
+    value = make_fruit_list(size)
+    print(f"\n🍎 {size} fruits")
+    print(f"   {'codec':<18} {'encode':>10} {'decode':>10} {'stored':>12}")
+    baseline_size = None
+    for serializer in SERIALIZERS:
+        for compression in [None, *COMPRESSORS]:
+            codec = CacheCodec(serializer, compression, threshold=0)
+            data = codec.encode(value)
+            assert codec.decode(data) == value, f"{serializer}+{compression} did not round-trip"
+            encode = median_ms(lambda: codec.encode(value), iterations)
+            decode = median_ms(lambda: codec.decode(data), iterations)
+            baseline_size = baseline_size or len(data)
+            name = f"{serializer}+{compression}" if compression else serializer
+            print(f"   {name:<18} {encode:>8.3f}ms {decode:>8.3f}ms {len(data):>9} B ({len(data) / baseline_size:.0%})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.iterations)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import string
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Set
+from urllib.parse import quote, urlencode
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.params import Depends
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from redis_client import async_redis_client
+from rendering import compress_body, negotiate_encoding, render_json, render_model, JSON_MEDIA_TYPE, RESPONSE_COMPRESSION
+
+logger = logging.getLogger(__name__)
+
+# Seconds an expired entry may still be served while it is refreshed in the
+# background (0 disables stale-while-revalidate)
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", "0"))
+# Lease on the cross-worker rebuild lock, and how long other workers wait for it
+CACHE_LOCK_LEASE_MS = int(os.getenv("CACHE_LOCK_LEASE_MS", "5000"))
+
+Loader = Callable[[], Awaitable[Any]]
+
+class SingleFlight:
+    """Collapses concurrent loads of the same key into one in-flight task."""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Loader) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        # Shield so a cancelled caller doesn't cancel the load for everyone else
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+_single_flight = SingleFlight()
+_background_refreshes: Set[asyncio.Task] = set()
+
+async def _read(key: str, raw: bool) -> Optional[dict]:
+    """Return the entry as ``{"v": value, "fresh_until": timestamp}``.
+
+    Raw entries hold an already-encoded body behind a ``<fresh_until>|``
+    prefix so they can be stored and returned without any JSON work.
+    """
+    if raw:
+        data = await async_redis_client.get_raw(key)
+        if data is None:
+            return None
+        stamp, sep, body = data.partition("|")
+        try:
+            return {"v": body, "fresh_until": float(stamp)} if sep else None
+        except ValueError:
+            return None
+    entry = await async_redis_client.get(key)
+    if not isinstance(entry, dict) or "fresh_until" not in entry:
+        # Missing, or written before entries carried a freshness stamp
+        return None
+    return entry
+
+async def _store(key: str, value: Any, ttl: int, stale_ttl: int, raw: bool, tags: Sequence[str]) -> dict:
+    fresh_until = time.time() + ttl
+    if raw:
+        stored = await async_redis_client.set_raw(key, f"{fresh_until:.3f}|{value}", expire=ttl + stale_ttl, tags=tags)
+    else:
+        stored = await async_redis_client.set(key, {"v": value, "fresh_until": fresh_until}, expire=ttl + stale_ttl, tags=tags)
+    # "stored" is False when the fill only exists in this response (e.g. Redis is down)
+    return {"v": value, "fresh_until": fresh_until, "stored": bool(stored)}
+
+async def _rebuild(key: str, loader: Loader, ttl: int, stale_ttl: int, stale: Optional[dict], raw: bool, tags: Sequence[str]) -> dict:
+    lock_name = f"lock:{key}"
+    token = uuid.uuid4().hex
+    acquired = await async_redis_client.acquire_lock(lock_name, token, CACHE_LOCK_LEASE_MS)
+    if acquired is False:
+        # Another worker is rebuilding: take the stale copy if we have one,
+        # otherwise wait for its result until the lease runs out
+        if stale is not None:
+            return stale
+        deadline = time.monotonic() + CACHE_LOCK_LEASE_MS / 1000
+        delay = 0.01
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+            entry = await _read(key, raw)
+            if entry is not None:
+                return entry
+        logger.warning(f"⏳ Rebuild lock for {key} expired without a value - loading directly")
+    try:
+        value = await loader()
+        return await _store(key, value, ttl, stale_ttl, raw, tags)
+    finally:
+        if acquired:
+            await async_redis_client.release_lock(lock_name, token)
+
+def _refresh_in_background(key: str, loader: Loader, ttl: int, stale_ttl: int, stale: dict, raw: bool, tags: Sequence[str]):
+    async def refresh():
+        try:
+            await _single_flight.do(key, lambda: _rebuild(key, loader, ttl, stale_ttl, stale, raw, tags))
+        except Exception as e:
+            logger.error(f"Background refresh of {key} failed: {e}")
+
+    task = asyncio.create_task(refresh())
+    _background_refreshes.add(task)
+    task.add_done_callback(_background_refreshes.discard)
+
+async def get_or_load(
+    key: str,
+    loader: Loader,
+    ttl: int = 3600,
+    stale_ttl: Optional[int] = None,
+    raw: bool = False,
+    tags: Sequence[str] = (),
+) -> Any:
+    """Read ``key`` from the cache, loading it with ``loader`` on a miss.
+
+    Concurrent misses in this process share one load, and a Redis lock lets
+    only one worker rebuild at a time. With ``stale_ttl`` an expired entry is
+    served once more while a background task refreshes it. With ``raw`` the
+    loader must return a ``str`` that is cached verbatim. The entry is
+    registered under ``tags`` for invalidate_tags().
+    """
+    return (await _get_or_load_entry(key, loader, ttl, stale_ttl, raw, tags))["v"]
+
+async def _get_or_load_entry(key: str, loader: Loader, ttl: int, stale_ttl: Optional[int], raw: bool, tags: Sequence[str]) -> dict:
+    """get_or_load(), returning the whole entry so callers can see its freshness."""
+    stale_ttl = CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+    entry = await _read(key, raw)
+    if entry is not None:
+        if entry["fresh_until"] > time.time():
+            return entry
+        if stale_ttl > 0:
+            logger.info(f"♻️ Serving stale {key} while it is refreshed")
+            _refresh_in_background(key, loader, ttl, stale_ttl, entry, raw, tags)
+            return entry
+    return await _single_flight.do(key, lambda: _rebuild(key, loader, ttl, stale_ttl, entry, raw, tags))
+
+class CacheBatcher:
+    """Collects the cache traffic of one request into as few round trips as possible.
+
+    ``get`` calls made in the same event-loop tick (e.g. under
+    ``asyncio.gather``) are sent as one MGET, and values already fetched or
+    written in this request are answered locally. ``set`` calls are
+    buffered and written in one pipeline per tag set by ``flush()``, which
+    the ``cache_batcher`` dependency runs when the request finishes.
+    """
+
+    def __init__(self, client=async_redis_client):
+        self.client = client
+        self.round_trips = 0
+        self._values: Dict[str, Any] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        # Held until done: the loop keeps only weak references to tasks
+        self._dispatches: Set[asyncio.Task] = set()
+        self._writes: Dict[tuple, Dict[str, tuple]] = {}
+
+    async def get(self, key: str) -> Any:
+        if key in self._values:
+            return self._values[key]
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            if len(self._pending) == 1:
+                task = asyncio.create_task(self._dispatch())
+                self._dispatches.add(task)
+                task.add_done_callback(self._dispatches.discard)
+        return await future
+
+    async def get_many(self, keys: Sequence[str]) -> list:
+        return list(await asyncio.gather(*[self.get(key) for key in keys]))
+
+    async def _dispatch(self):
+        # Let every lookup queued in this tick join the batch first
+        await asyncio.sleep(0)
+        pending, self._pending = self._pending, {}
+        keys = list(pending)
+        try:
+            values = await self.client.get_many(keys)
+            self.round_trips += 1
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, value in zip(keys, values):
+            if value is not None:
+                self._values[key] = value
+            if not pending[key].done():
+                pending[key].set_result(value)
+
+    def set(self, key: str, value: Any, expire: int = 3600, tags: Sequence[str] = ()):
+        self._values[key] = value
+        self._writes.setdefault(tuple(tags), {})[key] = (value, expire)
+
+    async def flush(self) -> bool:
+        writes, self._writes = self._writes, {}
+        ok = True
+        for tags, items in writes.items():
+            ok &= await self.client.set_many(
+                {key: value for key, (value, _) in items.items()},
+                ttls={key: expire for key, (_, expire) in items.items()},
+                tags=tags,
+            )
+            self.round_trips += 1
+        return ok
+
+async def cache_batcher():
+    """FastAPI dependency: a CacheBatcher for the current request."""
+    batcher = CacheBatcher()
+    try:
+        yield batcher
+    finally:
+        await batcher.flush()
+
+# Hits and misses per @cached route path (or key template, for views that
+# other routes call), reported by GET /stats/cache
+route_stats: Dict[str, Dict[str, int]] = {}
+
+def _route_counter(name: str) -> Dict[str, int]:
+    return route_stats.setdefault(name, {"hits": 0, "misses": 0})
+
+def route_cache_stats() -> dict:
+    return {
+        name: {**counts, "hit_ratio": counts["hits"] / (counts["hits"] + counts["misses"]) if counts["hits"] + counts["misses"] else 0.0}
+        for name, counts in route_stats.items()
+    }
+
+async def _call(func: Callable, kwargs: dict) -> Any:
+    if inspect.iscoroutinefunction(func):
+        return await func(**kwargs)
+    return await run_in_threadpool(func, **kwargs)
+
+def _render(result: Any, model: Optional[type]) -> bytes:
+    if isinstance(result, Response):
+        raise TypeError("@cached handlers must return data, not a Response")
+    if model is not None and isinstance(model, type) and issubclass(model, BaseModel):
+        if not isinstance(result, model):
+            result = model.model_validate(result)
+        return render_model(result)
+    if isinstance(result, BaseModel):
+        return render_model(result)
+    return render_json(jsonable_encoder(result))
+
+def _with_request_param(func: Callable, name: str) -> inspect.Signature:
+    """Signature of ``func`` plus a ``Request`` parameter FastAPI will inject."""
+    signature = inspect.signature(func)
+    parameters = list(signature.parameters.values())
+    request_param = inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+    # Keyword-only parameters must come after the positional ones
+    index = next((i for i, p in enumerate(parameters) if p.kind in (p.KEYWORD_ONLY, p.VAR_KEYWORD)), len(parameters))
+    parameters.insert(index, request_param)
+    return signature.replace(parameters=parameters)
+
+_REQUEST_PARAM = "_cache_request"
+# Passed by callers that invoke a cached handler directly; the names are
+# reserved so they can't shadow a query parameter of the handler
+ACCEPT_ENCODING_PARAM = "_cache_accept_encoding"
+VERSION_PARAM = "_cache_version"
+_RESERVED_PARAMS = (_REQUEST_PARAM, ACCEPT_ENCODING_PARAM, VERSION_PARAM)
+
+def _key_parameters(func: Callable, key: str) -> list:
+    """Handler arguments that must be part of the cache key but aren't in its template."""
+    in_template = {field for _, field, _, _ in string.Formatter().parse(key) if field}
+    names = []
+    for name, parameter in inspect.signature(func).parameters.items():
+        if name in in_template or isinstance(parameter.default, Depends):
+            continue
+        if isinstance(parameter.annotation, type) and issubclass(parameter.annotation, (Request, Response)):
+            continue
+        names.append(name)
+    return names
+
+def _variant_key(key: str, encoding: str) -> str:
+    return f"{key}:{encoding}"
+
+async def _read_variant(key: str, encoding: str) -> Optional[tuple]:
+    """``(fresh_until, content_encoding, payload)`` of a stored variant, or None."""
+    data = await async_redis_client.get_blob(_variant_key(key, encoding))
+    if data is None:
+        return None
+    try:
+        stamp, content_encoding, payload = data.split(b"|", 2)
+        return float(stamp), content_encoding.decode("ascii") or None, payload
+    except ValueError:
+        return None
+
+async def _store_variants(key: str, entry: dict, encodings: Sequence[str], expire: int, tags: Sequence[str], store: bool = True) -> Dict[str, tuple]:
+    """Compress a cached body once per encoding and, with ``store``, keep each
+    result next to it.
+
+    A body below the size threshold (or one that doesn't shrink) is stored
+    uncompressed under the variant key, so a hit is still a single GET.
+    """
+    body = entry["v"].encode("utf-8")
+
+    async def compress(encoding: str) -> tuple:
+        # zlib and brotli release the GIL, so this doesn't stall the event loop
+        content_encoding, payload = await run_in_threadpool(compress_body, body, encoding)
+        if store:
+            header = f"{entry['fresh_until']:.3f}|{content_encoding or ''}|".encode("ascii")
+            await async_redis_client.set_blob(_variant_key(key, encoding), header + payload, expire=expire, tags=tags)
+        return content_encoding, payload
+
+    results = await asyncio.gather(*[compress(encoding) for encoding in encodings])
+    return dict(zip(encodings, results))
+
+def _compressed_response(content_encoding: Optional[str], payload: bytes) -> Response:
+    headers = {"Vary": "Accept-Encoding"}
+    if content_encoding is not None:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=payload, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+def cached(
+    key: str,
+    ttl: int = 3600,
+    tags: Sequence[str] = (),
+    vary_on: Sequence[str] = (),
+    stale_ttl: Optional[int] = None,
+    response_model: Optional[type] = None,
+    compress: bool = False,
+):
+    """Cache a route's encoded response in Redis.
+
+    ``key`` and ``tags`` are ``str.format`` templates over the handler's
+    arguments (e.g. ``"fruits:category:{category}"``); values are
+    percent-escaped in the key. Every other argument
+    (dependencies aside) is appended to the key, as are the values of the
+    ``vary_on`` query parameters the handler doesn't take itself. The body is
+    serialized through ``response_model`` - by default the one declared on
+    the route - and hits are returned as-is without re-validation. Works on
+    sync and async handlers; loads go through get_or_load, so misses are
+    single-flighted and locked across workers.
+
+    With ``compress`` each fill also stores the body compressed with every
+    RESPONSE_COMPRESSION encoding, and requests get the variant their
+    ``Accept-Encoding`` asks for, so no request spends CPU compressing.
+    Callers invoking the handler directly pass the header as
+    ``_cache_accept_encoding`` (ACCEPT_ENCODING_PARAM).
+
+    A caller that derives an ETag from a version counter passes the version
+    it read as ``_cache_version`` (VERSION_PARAM). It becomes part of the key, so no cache tier can
+    pair that ETag with a body from another version: in particular, other
+    workers drop their L1 copies asynchronously after an invalidation.
+    """
+    def decorator(func: Callable):
+        signature = inspect.signature(func)
+        reserved = [name for name in _RESERVED_PARAMS if name in signature.parameters]
+        if reserved:
+            raise TypeError(f"@cached handler {func.__name__} uses reserved parameter names: {', '.join(reserved)}")
+        needs_request = response_model is None or compress or any(name not in signature.parameters for name in vary_on)
+        varies = list(dict.fromkeys([*_key_parameters(func, key), *vary_on]))
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            request: Optional[Request] = kwargs.pop(_REQUEST_PARAM, None)
+            accept_encoding = kwargs.pop(ACCEPT_ENCODING_PARAM, None)
+            version = kwargs.pop(VERSION_PARAM, None)
+            if accept_encoding is None and request is not None:
+                accept_encoding = request.headers.get("accept-encoding")
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+
+            varying = []
+            for name in varies:
+                value = arguments[name] if name in arguments else request.query_params.get(name)
+                if value is not None:
+                    varying.append((name, value))
+            # Escaped, so a value can't spell out another entry's key (":page?limit=5")
+            cache_key = key.format(**{name: quote(str(value), safe="") for name, value in arguments.items()})
+            if varying:
+                cache_key = f"{cache_key}?{urlencode(sorted(varying))}"
+            if version is not None:
+                cache_key = f"{cache_key}@{version}"
+
+            route = request.scope.get("route") if request is not None else None
+            model = response_model
+            if model is None:
+                model = getattr(route, "response_model", None)
+            counter = _route_counter(getattr(route, "path", key))
+
+            encoding = negotiate_encoding(accept_encoding) if compress else None
+            if encoding is not None:
+                variant = await _read_variant(cache_key, encoding)
+                if variant is not None and variant[0] > time.time():
+                    counter["hits"] += 1
+                    return _compressed_response(variant[1], variant[2])
+
+            loaded = False
+
+            async def load() -> str:
+                nonlocal loaded
+                loaded = True
+                result = await _call(func, arguments)
+                return _render(result, model).decode("utf-8")
+
+            entry_tags = [tag.format(**arguments) for tag in tags]
+            entry = await _get_or_load_entry(cache_key, load, ttl, stale_ttl, True, entry_tags)
+            counter["misses" if loaded else "hits"] += 1
+            # Variants are only worth storing next to a fresh entry that is itself
+            # in Redis: not for a fill Redis didn't take, nor a stale SWR copy
+            store = entry.get("stored", True) and entry["fresh_until"] > time.time()
+            if compress and ((loaded and store) or encoding is not None):
+                # A stored fill prepares every encoding; otherwise (a hit that
+                # found no variant, or a fill that wasn't stored) only this
+                # request's own is compressed
+                encodings = RESPONSE_COMPRESSION if loaded and store else [encoding]
+                expire = ttl + (CACHE_STALE_TTL if stale_ttl is None else stale_ttl)
+                variants = await _store_variants(cache_key, entry, encodings, expire, entry_tags, store)
+                if encoding is not None:
+                    return _compressed_response(*variants[encoding])
+            headers = {"Vary": "Accept-Encoding"} if compress else None
+            return Response(content=entry["v"], media_type=JSON_MEDIA_TYPE, headers=headers)
+
+        if needs_request:
+            wrapper.__signature__ = _with_request_param(func, _REQUEST_PARAM)
+        return wrapper
+    return decorator
+
+async def invalidate(tags: Sequence[str], counters: Sequence[str] = ()):
+    """Delete every entry registered under ``tags``, then bump the version ``counters``."""
+    await async_redis_client.invalidate_tags(*tags)
+    # Bump after the delete so a new version is never paired with the old payload
+    for counter_key in counters:
+        await async_redis_client.bump_counter(counter_key)
+
+def invalidates(tags: Sequence[str] = (), counters: Sequence[str] = ()):
+    """Invalidate ``tags`` (format templates over the handler's arguments)
+    after the handler succeeds, then bump the given version ``counters``."""
+    def decorator(func: Callable):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            result = await _call(func, arguments)
+            await invalidate([tag.format(**arguments) for tag in tags], counters)
+            logger.info(f"🗑️ Cache invalidated after {func.__name__}")
+            return result
+
+        return wrapper
+    return decorator
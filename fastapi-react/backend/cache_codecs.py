@@ -0,0 +1,177 @@
+"""Serialization and compression for values stored in Redis.
+
+Encoded values start with a two byte header - ``\\x00`` followed by
+``serializer_id << 4 | compressor_id`` - so workers running different
+settings can read each other's values during a rollout. Values without the
+header are legacy plain JSON (or plain text for raw entries). JSON text can
+never start with a NUL byte, so the two can't be confused.
+
+The default (json, no compression) still writes the legacy plain format,
+so turning the codec layer on changes nothing until another serializer or
+a compressor is configured.
+"""
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the json module is the fallback
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # only needed for CACHE_CODEC=msgpack
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # only needed for CACHE_COMPRESSION=zstd
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # only needed for CACHE_COMPRESSION=lz4
+    lz4_frame = None
+
+MAGIC = b"\x00"
+HEADER_SIZE = 2
+
+def _json_loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+class Serializer(NamedTuple):
+    id: int
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+class Compressor(NamedTuple):
+    id: int
+    compress: Callable[[bytes, Optional[int]], bytes]
+    decompress: Callable[[bytes], bytes]
+
+def _serializers() -> Dict[str, Serializer]:
+    serializers = {
+        # id 0 is reserved for raw UTF-8 text (see encode_text)
+        "json": Serializer(1, lambda value: json.dumps(value, default=str).encode("utf-8"), _json_loads),
+    }
+    if orjson is not None:
+        serializers["orjson"] = Serializer(2, lambda value: orjson.dumps(value, default=str), _json_loads)
+    if msgpack is not None:
+        serializers["msgpack"] = Serializer(
+            3,
+            lambda value: msgpack.packb(value, default=str, use_bin_type=True),
+            lambda data: msgpack.unpackb(data, raw=False),
+        )
+    return serializers
+
+def _compressors() -> Dict[str, Compressor]:
+    compressors = {}
+    if zstandard is not None:
+        compressors["zstd"] = Compressor(
+            1,
+            lambda data, level: zstandard.ZstdCompressor(level=level or 3).compress(data),
+            lambda data: zstandard.ZstdDecompressor().decompress(data),
+        )
+    if lz4_frame is not None:
+        compressors["lz4"] = Compressor(
+            2,
+            lambda data, level: lz4_frame.compress(data, compression_level=level or 0),
+            lz4_frame.decompress,
+        )
+    return compressors
+
+SERIALIZERS = _serializers()
+COMPRESSORS = _compressors()
+_SERIALIZERS_BY_ID = {serializer.id: serializer for serializer in SERIALIZERS.values()}
+_COMPRESSORS_BY_ID = {compressor.id: compressor for compressor in COMPRESSORS.values()}
+
+class CacheCodec:
+    """Encodes cache values to bytes and back.
+
+    ``serializer`` is one of json / orjson / msgpack; ``compression`` is
+    None, zstd or lz4 and only applies to payloads of at least ``threshold``
+    bytes that actually shrink. Decoding accepts every format this module
+    can write, whatever the instance is configured with.
+    """
+
+    def __init__(self, serializer: str = "json", compression: Optional[str] = None, threshold: int = 1024, level: Optional[int] = None):
+        if serializer not in SERIALIZERS:
+            logger.warning(f"⚠️ Cache serializer {serializer!r} is not available - using json")
+            serializer = "json"
+        if compression and compression not in COMPRESSORS:
+            logger.warning(f"⚠️ Cache compression {compression!r} is not available - storing uncompressed")
+            compression = None
+        self.serializer_name = serializer
+        self.compression_name = compression or None
+        self.serializer = SERIALIZERS[serializer]
+        self.compressor = COMPRESSORS[compression] if compression else None
+        self.threshold = threshold
+        self.level = level
+
+    def _pack(self, serializer_id: int, payload: bytes, plain: bool) -> bytes:
+        compressor_id = 0
+        if self.compressor is not None and len(payload) >= self.threshold:
+            compressed = self.compressor.compress(payload, self.level)
+            if len(compressed) < len(payload):
+                payload, compressor_id = compressed, self.compressor.id
+        if plain and compressor_id == 0:
+            return payload
+        return MAGIC + bytes([serializer_id << 4 | compressor_id]) + payload
+
+    def _unpack(self, data: bytes) -> tuple:
+        """Return ``(serializer_id, payload)``; None for the legacy format."""
+        if not data.startswith(MAGIC):
+            return None, data
+        if len(data) < HEADER_SIZE:
+            raise ValueError("Truncated cache value header")
+        serializer_id, compressor_id = data[1] >> 4, data[1] & 0x0F
+        payload = data[HEADER_SIZE:]
+        if compressor_id:
+            compressor = _COMPRESSORS_BY_ID.get(compressor_id)
+            if compressor is None:
+                raise ValueError(f"Cache value uses compressor {compressor_id}, which is not installed")
+            payload = compressor.decompress(payload)
+        return serializer_id, payload
+
+    def encode(self, value: Any) -> bytes:
+        # Uncompressed json stays in the legacy format older workers can read
+        return self._pack(self.serializer.id, self.serializer.dumps(value), plain=self.serializer_name == "json")
+
+    def decode(self, data: bytes) -> Any:
+        serializer_id, payload = self._unpack(data)
+        if serializer_id is None:
+            return _json_loads(payload)
+        serializer = _SERIALIZERS_BY_ID.get(serializer_id)
+        if serializer is None:
+            raise ValueError(f"Cache value uses serializer {serializer_id}, which is not installed")
+        return serializer.loads(payload)
+
+    def encode_text(self, text: str) -> bytes:
+        """Encode an already-serialized body (get_raw/set_raw entries)."""
+        return self._pack(0, text.encode("utf-8"), plain=True)
+
+    def decode_text(self, data: bytes) -> str:
+        serializer_id, payload = self._unpack(data)
+        if serializer_id not in (None, 0):
+            raise ValueError(f"Expected a raw text entry, got serializer {serializer_id}")
+        return payload.decode("utf-8")
+
+    def describe(self) -> dict:
+        return {
+            "serializer": self.serializer_name,
+            "compression": self.compression_name,
+            "threshold": self.threshold,
+        }
+
+def codec_from_env() -> CacheCodec:
+    level = os.getenv("CACHE_COMPRESSION_LEVEL")
+    return CacheCodec(
+        serializer=os.getenv("CACHE_CODEC", "json"),
+        compression=os.getenv("CACHE_COMPRESSION") or None,
+        threshold=int(os.getenv("CACHE_COMPRESSION_THRESHOLD", "1024")),
+        level=int(level) if level else None,
+    )
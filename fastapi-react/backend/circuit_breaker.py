@@ -0,0 +1,112 @@
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker driven by the outcome of real commands.
+
+    closed     - every call goes through; consecutive failures are counted
+    open       - calls are rejected immediately until ``probe_interval`` passes
+    half_open  - a single probe call is let through; ``success_threshold``
+                 successes close the breaker again, any failure re-opens it
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, probe_interval: float = 10.0, success_threshold: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.success_threshold = success_threshold
+        self.state = self.CLOSED
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._half_open_successes = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.counters: Dict[str, int] = {
+            "allowed": 0,
+            "rejected": 0,
+            "successes": 0,
+            "failures": 0,
+        }
+        self.transitions: Dict[str, int] = {}
+
+    def _transition(self, new_state: str):
+        key = f"{self.state}->{new_state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        logger.warning(f"⚡ Circuit '{self.name}' {key}")
+        self.state = new_state
+        if new_state == self.OPEN:
+            self._opened_at = time.monotonic()
+        self._consecutive_failures = 0
+        self._half_open_successes = 0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        return self.admit() is not None
+
+    def admit(self) -> Optional[bool]:
+        """Like allow_request(), but tells the half-open probe apart: None if
+        the call is rejected, True if it took the probe slot, else False."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.probe_interval:
+                    self.counters["rejected"] += 1
+                    return None
+                self._transition(self.HALF_OPEN)
+            probe = self.state == self.HALF_OPEN
+            if probe:
+                if self._probe_in_flight:
+                    self.counters["rejected"] += 1
+                    return None
+                self._probe_in_flight = True
+            self.counters["allowed"] += 1
+            return probe
+
+    def release(self):
+        """Give back the probe slot of a call admitted as the half-open probe
+        that ended without an outcome (e.g. cancelled).
+
+        Otherwise the breaker would reject every call from then on. Only the
+        call that took the slot may release it.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.counters["successes"] += 1
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.success_threshold:
+                    self._transition(self.CLOSED)
+            else:
+                self._consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.counters["failures"] += 1
+            if self.state == self.HALF_OPEN:
+                self._transition(self.OPEN)
+            elif self.state == self.CLOSED:
+                self._consecutive_failures += 1
+                if self._consecutive_failures >= self.failure_threshold:
+                    self._transition(self.OPEN)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state,
+                "consecutive_failures": self._consecutive_failures,
+                **self.counters,
+                "transitions": dict(self.transitions),
+            }
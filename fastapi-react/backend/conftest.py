@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The backend modules are imported flat, as main.py does
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# A manual check against a running Redis, not part of the suite
+collect_ignore = ["test_redis.py"]
@@ -1,10 +1,25 @@
-from sqlalchemy import create_engine, Column, Integer, String, text
+from sqlalchemy import create_engine, inspect, Column, Index, Integer, String, text
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from contextlib import ExitStack, contextmanager
+from fastapi import Request, Response
+from typing import Callable, Iterator, List, Optional
+import functools
+import itertools
+import math
 import os
+import re
+import time
 import logging
+import threading
 from dotenv import load_dotenv
 
+from circuit_breaker import CircuitBreaker
+from env import env_flag
+from startup import startup_timer
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -18,12 +33,111 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL not found in environment variables. Please check your .env file.")
 
+# Callables taking (event, engine_label, value); used to export metrics
+pool_observers: List[Callable[[str, str, float], None]] = []
+
+class PoolStats:
+    """Checkout wait times, timeouts and overflow events for one pool."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+        self.overflow_events = 0
+
+    def record(self, wait: float, overflowed: bool, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                if overflowed:
+                    self.overflow_events += 1
+        for observer in pool_observers:
+            observer("timeout" if timed_out else "checkout", self.label, wait)
+            if overflowed:
+                observer("overflow", self.label, 0.0)
+
+class TimedPoolMixin:
+    """Times how long each checkout waits for a connection.
+
+    That separates "waiting on the pool" from "waiting on the database"
+    when latency climbs under load.
+    """
+
+    engine_label = "sync"
+
+    @property
+    def stats(self) -> PoolStats:
+        if "_stats" not in self.__dict__:
+            self._stats = PoolStats(self.engine_label)
+        return self._stats
+
+    def _do_get(self):
+        overflow_before = self.overflow()
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - start, False, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start, self.overflow() > max(overflow_before, 0))
+        return connection
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    engine_label = "async"
+
+def engine_options(url: str, poolclass) -> dict:
+    # In-memory SQLite keeps its own single-connection pool
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        return {"connect_args": {"check_same_thread": False}} if "aiosqlite" not in url else {}
+    options = {
+        "poolclass": poolclass,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "-1")),
+        "pool_pre_ping": env_flag("DB_POOL_PRE_PING"),
+    }
+    if url.startswith("sqlite") and "aiosqlite" not in url:
+        # Sessions are used from the threadpool
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
+def async_database_url(url: str) -> str:
+    """Map a sync URL onto its async driver (asyncpg / aiosqlite)."""
+    scheme, sep, rest = url.partition("://")
+    driver = scheme.split("+")[0]
+    if driver in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    if driver == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    return url
+
 # Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, TimedQueuePool))
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional async engine (DATABASE_ASYNC=true, or an explicit ASYNC_DATABASE_URL)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (async_database_url(DATABASE_URL) if env_flag("DATABASE_ASYNC") else None)
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DATABASE_URL:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, TimedAsyncAdaptedQueuePool))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Create Base class for declarative models
 Base = declarative_base()
 
@@ -35,13 +149,224 @@ def get_db():
     finally:
         db.close()
 
+# Dependency to get an async database session (requires the async engine)
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database engine is not configured (set DATABASE_ASYNC=true)")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Read replicas: comma-separated URLs of copies of DATABASE_URL
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# round_robin or least_connections
+DATABASE_REPLICA_STRATEGY = os.getenv("DATABASE_REPLICA_STRATEGY", "round_robin")
+# Seconds a replica that failed is skipped before it is probed again
+DATABASE_REPLICA_PROBE_INTERVAL = float(os.getenv("DATABASE_REPLICA_PROBE_INTERVAL", "5"))
+# After a write, reads go to the primary for this long (seconds, 0 = never);
+# set it above the replicas' usual lag
+DATABASE_READ_YOUR_WRITES_SECONDS = float(os.getenv("DATABASE_READ_YOUR_WRITES_SECONDS", "5"))
+PIN_COOKIE = "db_pin"
+
+class Replica:
+    def __init__(self, index: int, url: str):
+        self.label = f"replica-{index}"
+        self.engine = create_engine(url, **engine_options(url, TimedQueuePool))
+        # Pool statistics are reported under this replica's label
+        self.engine.pool.engine_label = self.label
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.breaker = CircuitBreaker(self.label, failure_threshold=1, probe_interval=DATABASE_REPLICA_PROBE_INTERVAL)
+        self.in_flight = 0
+
+    def available(self) -> bool:
+        if not self.breaker.allow_request():
+            return False
+        if self.breaker.state == CircuitBreaker.CLOSED:
+            return True
+        # Half-open: make sure it answers before sending it a real query
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except Exception as e:
+            logger.warning(f"⚠️ {self.label} is still unavailable: {e}")
+            self.breaker.record_failure()
+            return False
+        self.breaker.record_success()
+        return True
+
+class ReadRouter:
+    """Sends read-only sessions to a healthy replica, or to the primary.
+
+    Reads stay on the primary for DATABASE_READ_YOUR_WRITES_SECONDS after a
+    write when the caller passes ``pinned``: for one client from its pin
+    cookie, and for shared cache fills from the write marker in Redis.
+    """
+
+    def __init__(self, urls: List[str], strategy: str = DATABASE_REPLICA_STRATEGY):
+        if strategy not in ("round_robin", "least_connections"):
+            raise ValueError(f"Unknown DATABASE_REPLICA_STRATEGY: {strategy}")
+        self.replicas = [Replica(i, url) for i, url in enumerate(urls)]
+        self.strategy = strategy
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self.counters = {"replica_reads": 0, "primary_reads": 0, "pinned_reads": 0, "failovers": 0, "replica_errors": 0}
+
+    def choose(self, pinned: bool = False) -> Optional[Replica]:
+        """A replica to read from, or None for the primary."""
+        if not self.replicas:
+            self.counters["primary_reads"] += 1
+            return None
+        if pinned:
+            self.counters["pinned_reads"] += 1
+            return None
+        if self.strategy == "least_connections":
+            candidates = sorted(self.replicas, key=lambda replica: replica.in_flight)
+        else:
+            start = next(self._turn) % len(self.replicas)
+            candidates = self.replicas[start:] + self.replicas[:start]
+        for replica in candidates:
+            if replica.available():
+                self.counters["replica_reads"] += 1
+                return replica
+        self.counters["failovers"] += 1
+        return None
+
+    @contextmanager
+    def session(self, pinned: bool = False) -> Iterator:
+        replica = self.choose(pinned)
+        if replica is None:
+            with SessionLocal() as db:
+                yield db
+            return
+        db = replica.SessionLocal()
+        try:
+            # Connect up front, so an unreachable replica falls back to the
+            # primary before the caller has sent anything
+            db.connection()
+        except OperationalError as e:
+            db.close()
+            logger.warning(f"⚠️ Could not connect to {replica.label}, reading from the primary: {e}")
+            self.counters["replica_errors"] += 1
+            self.counters["failovers"] += 1
+            replica.breaker.record_failure()
+            with SessionLocal() as db:
+                yield db
+            return
+        with self._lock:
+            replica.in_flight += 1
+        try:
+            yield db
+        except OperationalError:
+            self.counters["replica_errors"] += 1
+            replica.breaker.record_failure()
+            raise
+        else:
+            replica.breaker.record_success()
+        finally:
+            db.close()
+            with self._lock:
+                replica.in_flight -= 1
+
+    def execute(self, statement, pinned: bool = False) -> list:
+        """Run a read-only statement, retrying on the primary if the replica fails."""
+        try:
+            with self.session(pinned) as db:
+                return db.execute(statement).all()
+        except OperationalError as e:
+            if not self.replicas:
+                raise
+            logger.warning(f"⚠️ Replica read failed, retrying on the primary: {e}")
+            with SessionLocal() as db:
+                return db.execute(statement).all()
+
+    def stats(self) -> dict:
+        return {
+            "strategy": self.strategy,
+            "read_your_writes_seconds": DATABASE_READ_YOUR_WRITES_SECONDS,
+            "replicas": {
+                replica.label: {"in_flight": replica.in_flight, "circuit_breaker": replica.breaker.stats()}
+                for replica in self.replicas
+            },
+            **self.counters,
+        }
+
+read_router = ReadRouter(DATABASE_REPLICA_URLS)
+
+def is_pinned(request: Request) -> bool:
+    """Whether this client wrote recently enough that it must read from the primary."""
+    try:
+        return float(request.cookies.get(PIN_COOKIE, "0")) > time.time()
+    except ValueError:
+        return False
+
+# Dependency for routes that write: a primary session, and the client is
+# pinned to the primary for its next reads
+def get_write_db(response: Response):
+    if read_router.replicas and DATABASE_READ_YOUR_WRITES_SECONDS > 0:
+        pin_until = time.time() + DATABASE_READ_YOUR_WRITES_SECONDS
+        response.set_cookie(PIN_COOKIE, f"{pin_until:.3f}", max_age=math.ceil(DATABASE_READ_YOUR_WRITES_SECONDS), httponly=True, samesite="lax")
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Dependency for read-only routes: a function returning the request's read
+# session - from a replica unless the client is pinned - opened on first call,
+# so requests answered from the cache never check one out
+def get_read_db(request: Request):
+    pinned = is_pinned(request)
+    with ExitStack() as stack:
+        @functools.cache
+        def session():
+            return stack.enter_context(read_router.session(pinned))
+        yield session
+
+def _pool_stats(pool) -> dict:
+    stats = {"pool": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+        })
+    if isinstance(pool, TimedPoolMixin):
+        timing = pool.stats
+        stats.update({
+            "checkouts": timing.checkouts,
+            "checkout_wait_avg_ms": timing.total_wait / timing.checkouts * 1000 if timing.checkouts else 0.0,
+            "checkout_wait_max_ms": timing.max_wait * 1000,
+            "checkout_wait_total_s": timing.total_wait,
+            "checkout_timeouts": timing.timeouts,
+            "overflow_events": timing.overflow_events,
+        })
+    return stats
+
+def pool_stats() -> dict:
+    stats = {"sync": _pool_stats(engine.pool)}
+    if async_engine is not None:
+        stats["async"] = _pool_stats(async_engine.sync_engine.pool)
+    for replica in read_router.replicas:
+        stats[replica.label] = _pool_stats(replica.engine.pool)
+    return stats
+
 # Fruit model
 class Fruit(Base):
     __tablename__ = "fruits"
+    __table_args__ = (
+        # ?category= filtering, and the (name, category) lookup in add_fruit
+        Index("ix_fruits_category", "category"),
+        Index("ix_fruits_name_category", "name", "category"),
+        # Never hand a deleted row's id to a new one (SQLite reuses the highest
+        # rowid otherwise); the write-through cache tracks versions per id
+        {"sqlite_autoincrement": True},
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True, nullable=False)
     category=Column(String)
+    # Incremented on every update; orders write-through cache patches
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
 
 
@@ -65,10 +390,62 @@ def create_tables():
 def test_connection():
     try:
         with engine.connect() as connection:
-            result = connection.execute(text("SELECT version()"))
-            version = result.fetchone()[0]
-            logger.info(f"🐘 PostgreSQL version: {version}")
+            # SELECT version() is PostgreSQL-only; the dialect already read the
+            # server version while connecting
+            connection.execute(text("SELECT 1"))
+            version = ".".join(str(part) for part in connection.dialect.server_version_info or ()) or "unknown"
+            logger.info(f"🐘 {engine.dialect.name} version: {version}")
             return True
     except Exception as e:
         logger.error(f"❌ Database connection test failed: {e}")
         return False
+
+ALEMBIC_VERSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic", "versions")
+_REVISION_LINE = re.compile(r"^(down_revision|revision)\b[^=]*=\s*(.+)$", re.MULTILINE)
+
+def alembic_head() -> Optional[str]:
+    """The single head revision of the migration scripts, or None.
+
+    Read straight from the revision files: importing alembic costs more
+    than the create_all this check is there to skip.
+    """
+    revisions, parents = set(), set()
+    for filename in os.listdir(ALEMBIC_VERSIONS_DIR):
+        if not filename.endswith(".py"):
+            continue
+        with open(os.path.join(ALEMBIC_VERSIONS_DIR, filename)) as f:
+            for field, value in _REVISION_LINE.findall(f.read()):
+                ids = set(re.findall(r"['\"]([0-9A-Za-z_]+)['\"]", value))
+                (revisions if field == "revision" else parents).update(ids)
+    heads = revisions - parents
+    return heads.pop() if len(heads) == 1 else None
+
+def schema_revision() -> Optional[str]:
+    """The revision Alembic last migrated the database to, or None."""
+    with engine.connect() as connection:
+        if not inspect(connection).has_table("alembic_version"):
+            return None
+        return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+def init_database() -> bool:
+    """Per-worker startup: check the connection, then make sure the tables exist.
+
+    Alembic owns the schema, so create_all (one existence check per table)
+    only runs when the database isn't already at the migration head.
+    """
+    with startup_timer.phase("database.connect"):
+        if not test_connection():
+            return False
+    with startup_timer.phase("database.schema"):
+        try:
+            head, current = alembic_head(), schema_revision()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read the Alembic revision: {e}")
+            head = current = None
+        if head is not None and current == head:
+            logger.info(f"✅ Database schema at Alembic head {head} - skipping create_all")
+            startup_timer.note("schema", f"alembic head {head}")
+        else:
+            create_tables()
+            startup_timer.note("schema", f"create_all (database at {current}, head {head})")
+    return True
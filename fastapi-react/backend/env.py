@@ -0,0 +1,5 @@
+import os
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """Read an on/off setting: 1, true, yes and on (any case) mean on."""
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes", "on")
@@ -1,15 +1,37 @@
+import time
+# Start of the import phase in GET /stats/startup: the imports below are most
+# of a cold start's CPU time
+IMPORT_STARTED = time.perf_counter()
+
 import uvicorn
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import Any, Callable, List, Optional, Set, Union
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from contextlib import asynccontextmanager
-import time
+from dataclasses import dataclass
+import asyncio
+import json
+import zlib
+import math
+import os
 import logging
 
-from database import get_db, Fruit as FruitModel, create_tables, test_connection
-from redis_client import redis_client
+from database import DATABASE_READ_YOUR_WRITES_SECONDS, get_read_db, get_write_db, read_router, SessionLocal, AsyncSessionLocal, engine, async_engine, pool_stats, pool_observers, Fruit as FruitModel, init_database
+from redis_client import async_redis_client
+from cache import ACCEPT_ENCODING_PARAM, VERSION_PARAM, cached, invalidate, invalidates, route_cache_stats
+from write_through import CACHE_WRITE_THROUGH, WriteThroughIndex
+from prefix_index import PrefixIndex
+from write_batcher import WRITE_BATCHING, WriteBatcher
+from rendering import negotiate_encoding, render_json, NDJSON_MEDIA_TYPE
+from startup import startup_timer
+from metrics import MetricsMiddleware, instrument_engine, mark_worker_dead, metrics_response, observe_pool, observe_redis
 
 class Fruit(BaseModel):
     name: str
@@ -18,16 +40,63 @@ class Fruit(BaseModel):
 class Fruits(BaseModel):
     fruits: List[Fruit]
 
+class FruitPage(BaseModel):
+    fruits: List[Fruit]
+    # Pass back as ?after= to fetch the next page; None on the last page
+    next_cursor: Optional[int] = None
+
+class BulkRowResult(BaseModel):
+    index: int
+    name: Optional[str] = None
+    status: str  # "created", "duplicate" or "invalid"
+    detail: Optional[str] = None
+
+class BulkResult(BaseModel):
+    created: int
+    duplicates: int
+    invalid: int
+    results: List[BulkRowResult]
+
+# Rows fetched per round trip when streaming
+STREAM_BATCH_SIZE = 1000
+# Names per IN (...) lookup / rows per INSERT batch on bulk imports; keeps us
+# under SQLite's bound-parameter limit
+BULK_CHUNK_SIZE = 500
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "100000"))
+# Bumped on every write; GET /fruits derives its ETag from it
+CATALOGUE_VERSION_KEY = "fruits:version"
+# Present for DATABASE_READ_YOUR_WRITES_SECONDS after a write on any worker;
+# while it is, cache fills read from the primary
+RECENT_WRITE_KEY = "fruits:recent_write"
+# Every cached view of the whole fruit catalogue is registered under this tag;
+# views filtered by ?category= only under their category's tag
+FRUITS_TAG = "fruits"
+# With CACHE_WRITE_THROUGH the catalogue is mirrored into a Redis hash that
+# writes patch in place, so rebuilding a view after a write skips the database
+fruit_index = WriteThroughIndex("fruits") if CACHE_WRITE_THROUGH else None
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Test database connection first
-    if test_connection():
-        # Create database tables on startup
-        create_tables()
-    else:
-        print("❌ Failed to connect to database. Please check your DATABASE_URL.")
+    startup_timer.imports_done(IMPORT_STARTED)
+
+    async def connect_redis():
+        with startup_timer.phase("redis"):
+            await async_redis_client.connect()
+
+    async def connect_database():
+        with startup_timer.phase("database"):
+            if not await run_in_threadpool(init_database):
+                print("❌ Failed to connect to database. Please check your DATABASE_URL.")
+
+    # Neither depends on the other, so wait for both at once
+    await asyncio.gather(connect_redis(), connect_database())
+    fruit_search.start()
+    startup_timer.ready()
     yield
-    # Cleanup code here (if needed)
+    await async_redis_client.close()
+    if async_engine is not None:
+        await async_engine.dispose()
+    mark_worker_dead()
 
 app = FastAPI(debug=True, lifespan=lifespan)
 
@@ -42,86 +111,481 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+app.add_middleware(MetricsMiddleware)
+
+async_redis_client.observers.append(observe_redis)
+pool_observers.append(observe_pool)
+instrument_engine(engine, "sync")
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine, "async")
+for replica in read_router.replicas:
+    instrument_engine(replica.engine, replica.label)
+
+def category_tag(category: str) -> str:
+    return f"{FRUITS_TAG}:category:{category}"
+
+# Bumped by every write to the category, so a category view's key only moves
+# when its own contents do
+def category_version_key(category: str) -> str:
+    return f"{category_tag(category)}:version"
+
+async def invalidate_categories(*categories: Optional[str]):
+    changed = sorted({category for category in categories if category is not None})
+    if changed:
+        await invalidate([category_tag(category) for category in changed], counters=[category_version_key(category) for category in changed])
+
+def fruit_rows_statement(after: Optional[int] = None, limit: Optional[int] = None, category: Optional[str] = None):
+    # Keyset pagination: seek past the last id instead of OFFSET, so every
+    # page costs the same no matter how deep it is
+    statement = select(FruitModel.id, FruitModel.name, FruitModel.category).order_by(FruitModel.id)
+    if category is not None:
+        statement = statement.where(FruitModel.category == category)
+    if after is not None:
+        statement = statement.where(FruitModel.id > after)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+def fetch_fruit_rows(statement) -> list:
+    # Runs in the threadpool: the session is only opened on a cache miss
+    with SessionLocal() as db:
+        return db.execute(statement).all()
+
+async def replica_may_fill() -> bool:
+    """Whether a cache fill, which every client will be served, may read from a replica."""
+    if not async_redis_client.is_connected():
+        # Can't see other workers' writes, so nothing says the replica has them
+        return False
+    return await async_redis_client.get_raw(RECENT_WRITE_KEY) is None
 
-@app.get("/fruits", response_model=Fruits)
-def get_fruits(db: Session = Depends(get_db)):
+async def mark_recent_write():
+    if read_router.replicas and DATABASE_READ_YOUR_WRITES_SECONDS > 0:
+        await async_redis_client.set_raw(RECENT_WRITE_KEY, "1", expire=math.ceil(DATABASE_READ_YOUR_WRITES_SECONDS))
+
+# Dependency for routes that write. The marker is set before the commit and
+# the cache invalidation, so no fill after them can come from a lagging
+# replica, and set again once the write is done to start the window there.
+async def pin_fills_to_primary():
+    await mark_recent_write()
+    yield
+    await mark_recent_write()
+
+async def query_fruit_rows(statement, use_replica: bool = True) -> list:
+    logging.info("🐘 Cache miss - loading fruits from the database")
+    if use_replica and read_router.replicas:
+        # Replicas are read through the sync engines
+        pinned = not await replica_may_fill()
+        return await run_in_threadpool(read_router.execute, statement, pinned)
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            return (await db.execute(statement)).all()
+    return await run_in_threadpool(fetch_fruit_rows, statement)
+
+# The write-through copy and the search index are snapshots that later write
+# events patch; a snapshot from a lagging replica would never be corrected,
+# so they are always loaded from the primary
+async def load_indexed_fruits() -> list:
+    statement = select(FruitModel.id, FruitModel.version, FruitModel.name, FruitModel.category).order_by(FruitModel.id)
+    rows = await query_fruit_rows(statement, use_replica=False)
+    return [(row.id, row.version, {"name": row.name, "category": row.category}) for row in rows]
+
+async def load_search_names() -> list:
+    return await query_fruit_rows(select(FruitModel.name, FruitModel.category), use_replica=False)
+
+# Type-ahead index over fruit names, kept current by write events
+fruit_search = PrefixIndex(load_search_names)
+
+def stream_fruits_ndjson(db: Session, after: Optional[int], category: Optional[str] = None):
+    # Rows are pulled with a server-side cursor and written out batch by
+    # batch, so memory stays flat however large the table is
+    statement = fruit_rows_statement(after, category=category)
+    result = db.execute(statement.execution_options(yield_per=STREAM_BATCH_SIZE))
+    for rows in result.partitions():
+        yield b"".join(render_json({"name": row.name, "category": row.category}) + b"\n" for row in rows)
+
+def fruits_etag(version: int, request: Request, content_encoding: Optional[str] = None) -> str:
+    # Pages and the full list are different representations of the same
+    # version, and so is each content coding actually sent of one of them
+    variant = zlib.crc32(request.url.query.encode("utf-8"))
+    suffix = f"-{content_encoding}" if content_encoding else ""
+    return f'"fruits-{version}-{variant:08x}{suffix}"'
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+# Cache the encoded response body for 1 hour (3600 seconds). Concurrent
+# misses share a single database load instead of stampeding after an
+# invalidation, and hits are returned without touching the models.
+@cached(key="fruits:list", ttl=3600, tags=[FRUITS_TAG], response_model=Fruits, compress=True)
+async def fruit_list_view():
+    if fruit_index is not None:
+        records = await fruit_index.all(load_indexed_fruits)
+        return Fruits(fruits=[Fruit(**record) for _, record in records])
+    rows = await query_fruit_rows(fruit_rows_statement())
+    return Fruits(fruits=[Fruit(name=row.name, category=row.category) for row in rows])
+
+@cached(key="fruits:page", ttl=3600, tags=[FRUITS_TAG], vary_on=["after", "limit"], response_model=FruitPage, compress=True)
+async def fruit_page_view(after: Optional[int], limit: int):
+    # Pages read the write-through copy once a list read has loaded it
+    records = await fruit_index.page(after, limit) if fruit_index is not None else None
+    if records is None:
+        rows = await query_fruit_rows(fruit_rows_statement(after, limit))
+        records = [(row.id, {"name": row.name, "category": row.category}) for row in rows]
+    return FruitPage(
+        fruits=[Fruit(**record) for _, record in records],
+        next_cursor=records[-1][0] if len(records) == limit else None,
+    )
+
+# One cached result per category, invalidated only by writes that touch it
+@cached(key="fruits:category:{category}", ttl=3600, tags=["fruits:category:{category}"], response_model=Fruits, compress=True)
+async def fruit_category_view(category: str):
+    rows = await query_fruit_rows(fruit_rows_statement(category=category))
+    return Fruits(fruits=[Fruit(name=row.name, category=row.category) for row in rows])
+
+@cached(key="fruits:category:{category}:page", ttl=3600, tags=["fruits:category:{category}"], vary_on=["after", "limit"], response_model=FruitPage, compress=True)
+async def fruit_category_page_view(category: str, after: Optional[int], limit: int):
+    rows = await query_fruit_rows(fruit_rows_statement(after, limit, category))
+    return FruitPage(
+        fruits=[Fruit(name=row.name, category=row.category) for row in rows],
+        next_cursor=rows[-1].id if len(rows) == limit else None,
+    )
+
+@app.get("/fruits", response_model=Union[Fruits, FruitPage])
+async def get_fruits(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; enables keyset pagination"),
+    after: Optional[int] = Query(None, description="Cursor (next_cursor of the previous page)"),
+    category: Optional[str] = Query(None, min_length=1, description="Only fruits in this category"),
+    read_db: Callable[[], Session] = Depends(get_read_db),
+):
     start_time = time.time()
     
-    # Try to get from cache first
-    cache_key = "fruits:list"
-    cached_fruits = redis_client.get(cache_key)
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        # The session stays open until the stream has been sent
+        return StreamingResponse(stream_fruits_ndjson(read_db(), after, category), media_type=NDJSON_MEDIA_TYPE)
     
-    if cached_fruits:
-        end_time = time.time()
-        logging.info(f"🚀 Cache hit! Retrieved fruits in {(end_time - start_time)*1000:.2f}ms")
-        return Fruits(fruits=[Fruit(**fruit) for fruit in cached_fruits])
+    # Conditional GET: answered from the version counter alone, without
+    # touching the database or the cached payload. The views are keyed by
+    # that version, or a category view by its category's, which writes bump
+    # before the catalogue's; either way the ETag describes the body sent
+    accept_encoding = request.headers.get("accept-encoding")
+    version = await async_redis_client.get_counter(CATALOGUE_VERSION_KEY)
+    if_none_match = request.headers.get("if-none-match")
+    if version is not None and if_none_match:
+        # Which coding the body went out in depends on its size, which isn't
+        # known yet; either ETag the client could hold names this version
+        for content_encoding in dict.fromkeys([negotiate_encoding(accept_encoding), None]):
+            etag = fruits_etag(version, request, content_encoding)
+            if etag_matches(etag, if_none_match):
+                return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept-Encoding"})
     
-    # Cache miss - get from database
-    fruits = db.query(FruitModel).all()
-    fruit_list = []
-    for fruit in fruits:
-        fruit_data = {"name": fruit.name}
-        if fruit.category is not None:
-            fruit_data["category"] = fruit.category
-        fruit_list.append(fruit_data)
-    
-    # Cache the result for 1 hour (3600 seconds)
-    redis_client.set(cache_key, fruit_list, expire=3600)
+    # Passed through to @cached under its reserved names
+    cache_options = {ACCEPT_ENCODING_PARAM: accept_encoding, VERSION_PARAM: version}
+    if category is not None:
+        category_version = await async_redis_client.get_counter(category_version_key(category))
+        cache_options[VERSION_PARAM] = category_version
+        if category_version is None:
+            # No key version to pair the catalogue's with
+            version = None
+    if category is not None and limit is not None:
+        response = await fruit_category_page_view(category=category, after=after, limit=limit, **cache_options)
+    elif category is not None:
+        response = await fruit_category_view(category=category, **cache_options)
+    elif limit is not None:
+        response = await fruit_page_view(after=after, limit=limit, **cache_options)
+    else:
+        response = await fruit_list_view(**cache_options)
+    response.headers["Vary"] = "Accept-Encoding"
+    if version is not None:
+        response.headers["ETag"] = fruits_etag(version, request, response.headers.get("content-encoding"))
     
     end_time = time.time()
-    logging.info(f"🐘 Database query! Retrieved fruits in {(end_time - start_time)*1000:.2f}ms")
+    logging.info(f"🚀 Retrieved fruits in {(end_time - start_time)*1000:.2f}ms")
     
-    return Fruits(fruits=[Fruit(**fruit_data) for fruit_data in fruit_list])
+    return response
+
+@app.get("/fruits/search", response_model=Fruits)
+async def search_fruits(
+    prefix: str = Query(..., min_length=1, max_length=100, description="Case-insensitive name prefix"),
+    limit: int = Query(10, ge=1, le=100),
+):
+    matches = await fruit_search.search(prefix, limit)
+    return Fruits(fruits=[Fruit(name=name, category=category) for name, category in matches])
+
+async def invalidate_fruit_cache(categories: Set[Optional[str]] = frozenset()):
+    """Drop every catalogue view and those of ``categories``, then move the ETag on."""
+    changed = sorted(category for category in categories if category is not None)
+    tags = [FRUITS_TAG, *(category_tag(category) for category in changed)]
+    # Category counters first: a client that sees the new catalogue version
+    # must also see the new version of every category it changed
+    counters = [*(category_version_key(category) for category in changed), CATALOGUE_VERSION_KEY]
+    await invalidate(tags, counters=counters)
+    logging.info("🗑️ Cache invalidated")
 
-@app.post("/fruits")
-def add_fruit(fruit: Fruit, db: Session = Depends(get_db)):
+def create_fruit(db: Session, fruit: Fruit, commit: bool = True) -> tuple:
     # Check if fruit already exists
     existing_fruit = db.query(FruitModel).filter(FruitModel.name == fruit.name, FruitModel.category == fruit.category).first()
     if existing_fruit:
         raise HTTPException(status_code=400, detail="Fruit already exists")
     
-    # Create new fruit
+    # Create new fruit; the flush assigns the id and version, so no refresh
+    # query is needed after the commit
     db_fruit = FruitModel(name=fruit.name, category=fruit.category)
     db.add(db_fruit)
-    db.commit()
-    db.refresh(db_fruit)
-    
-    # Invalidate cache
-    redis_client.delete("fruits:list")
-    logging.info("🗑️ Cache invalidated after adding fruit")
-    
-    return fruit
+    db.flush()
+    written = (db_fruit.id, db_fruit.version)
+    if commit:
+        db.commit()
+    return written
 
-@app.put("/fruits/{fruit_name}")
-def update_fruit(fruit_name: str, fruit: Fruit, db: Session = Depends(get_db)):
-    db_fruit = db.query(FruitModel).filter(FruitModel.name == fruit_name).first()
+def replace_fruit(db: Session, fruit_name: str, fruit: Fruit, commit: bool = True) -> tuple:
+    # Row lock so concurrent updates get distinct, commit-ordered versions
+    db_fruit = db.query(FruitModel).filter(FruitModel.name == fruit_name).with_for_update().first()
     if not db_fruit:
         raise HTTPException(status_code=404, detail="Fruit not found")
+    previous_category = db_fruit.category
     db_fruit.name = fruit.name
     db_fruit.category = fruit.category
-    db.commit()
-    db.refresh(db_fruit)
-    
-    # Invalidate cache
-    redis_client.delete("fruits:list")
-    logging.info("🗑️ Cache invalidated after updating fruit")
-    
-    return fruit
+    db_fruit.version += 1
+    written = (db_fruit.id, db_fruit.version, previous_category)
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+    return written
 
-@app.delete("/fruits/{fruit_name}")
-def delete_fruit(fruit_name: str, db: Session = Depends(get_db)):
-    fruit = db.query(FruitModel).filter(FruitModel.name == fruit_name).first()
+def remove_fruit(db: Session, fruit_name: str, commit: bool = True) -> tuple:
+    fruit = db.query(FruitModel).filter(FruitModel.name == fruit_name).with_for_update().first()
     if not fruit:
         raise HTTPException(status_code=404, detail="Fruit not found")
+    # The deletion counts as one more write, so it outranks the row's last update
+    written = (fruit.id, fruit.version + 1, fruit.category)
     db.delete(fruit)
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+    return written
+
+@dataclass
+class FruitWrite:
+    """One queued POST/PUT/DELETE /fruits for the write batcher."""
+    kind: str  # "create", "update" or "delete"
+    name: Optional[str] = None  # the fruit being updated or deleted
+    fruit: Optional[Fruit] = None
+
+def apply_fruit_writes(writes: List[FruitWrite]) -> list:
+    """Apply a batch of writes in one transaction, each inside its own
+    savepoint so a failing write is rolled back alone; returns each write's
+    result or exception."""
+    results = []
+    with SessionLocal() as db:
+        for write in writes:
+            try:
+                with db.begin_nested():
+                    if write.kind == "create":
+                        results.append(create_fruit(db, write.fruit, commit=False))
+                    elif write.kind == "update":
+                        results.append(replace_fruit(db, write.name, write.fruit, commit=False))
+                    else:
+                        results.append(remove_fruit(db, write.name, commit=False))
+            except Exception as e:
+                results.append(e)
+        db.commit()
+    return results
+
+async def publish_fruit_writes(done: List[tuple]):
+    """Cache and search-index upkeep for a committed batch, done once for all of it."""
+    categories: Set[Optional[str]] = set()
+    # Final state of every name the batch touched, so e.g. a create followed
+    # by a delete of the same fruit nets out: name -> (exists, category)
+    names = {}
+    for write, result in done:
+        if write.kind != "create":
+            categories.add(result[2])
+            names[write.name] = (False, None)
+        if write.kind == "delete":
+            if fruit_index is not None:
+                await fruit_index.remove(result[0], result[1])
+            continue
+        categories.add(write.fruit.category)
+        names[write.fruit.name] = (True, write.fruit.category)
+        if fruit_index is not None:
+            await fruit_index.upsert(result[0], result[1], write.fruit.model_dump())
+    await invalidate_fruit_cache(categories)
+    await fruit_search.publish(remove=list(names), add=[(name, category) for name, (exists, category) in names.items() if exists])
+
+# Opt-in (WRITE_BATCHING): coalesce concurrent single-fruit writes
+fruit_writes = WriteBatcher(apply_fruit_writes, publish_fruit_writes) if WRITE_BATCHING else None
+
+def parse_bulk_body(body: bytes, content_type: str) -> List[Any]:
+    if NDJSON_MEDIA_TYPE in content_type:
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+    data = json.loads(body)
+    if isinstance(data, dict) and "fruits" in data:
+        data = data["fruits"]
+    if not isinstance(data, list):
+        raise ValueError("expected a JSON array of fruits")
+    return data
+
+def bulk_insert_fruits(db: Session, fruits: List[Fruit]) -> Set[str]:
+    """Insert ``fruits`` (unique names) skipping existing ones; returns the names inserted."""
+    names = [fruit.name for fruit in fruits]
+    existing = set()
+    for i in range(0, len(names), BULK_CHUNK_SIZE):
+        chunk = names[i:i + BULK_CHUNK_SIZE]
+        existing.update(db.scalars(select(FruitModel.name).where(FruitModel.name.in_(chunk))))
+    rows = [{"name": fruit.name, "category": fruit.category} for fruit in fruits if fruit.name not in existing]
+    if not rows:
+        return set()
+    
+    # ON CONFLICT DO NOTHING covers rows a concurrent writer inserted after
+    # the lookup above; RETURNING tells us which rows actually went in
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = pg_insert if dialect == "postgresql" else sqlite_insert
+        statement = dialect_insert(FruitModel).on_conflict_do_nothing(index_elements=["name"]).returning(FruitModel.name)
+        inserted = set()
+        for i in range(0, len(rows), BULK_CHUNK_SIZE):
+            inserted.update(db.scalars(statement, rows[i:i + BULK_CHUNK_SIZE]))
+    else:
+        db.execute(insert(FruitModel), rows)
+        inserted = {row["name"] for row in rows}
     db.commit()
+    return inserted
+
+@app.post("/fruits/bulk", response_model=BulkResult, dependencies=[Depends(pin_fills_to_primary)])
+async def add_fruits_bulk(request: Request, db: Session = Depends(get_write_db)):
+    """Import many fruits at once from a JSON array or an NDJSON upload.
+
+    Rows whose name already exists (in the table or earlier in the upload)
+    are reported as duplicates; the cache is invalidated once at the end.
+    """
+    try:
+        items = parse_bulk_body(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bulk payload: {e}")
+    if len(items) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ROWS} fruits per request")
+    
+    results: List[BulkRowResult] = []
+    candidates: List[Fruit] = []
+    seen: Set[str] = set()
+    for index, item in enumerate(items):
+        try:
+            fruit = Fruit.model_validate(item)
+        except ValidationError as e:
+            results.append(BulkRowResult(index=index, status="invalid", detail=str(e.errors()[0]["msg"])))
+            continue
+        if fruit.name in seen:
+            results.append(BulkRowResult(index=index, name=fruit.name, status="duplicate", detail="Duplicate in upload"))
+            continue
+        seen.add(fruit.name)
+        candidates.append(fruit)
+        results.append(BulkRowResult(index=index, name=fruit.name, status="created"))
     
-    # Invalidate cache
-    redis_client.delete("fruits:list")
-    logging.info("🗑️ Cache invalidated after deleting fruit")
+    inserted = await run_in_threadpool(bulk_insert_fruits, db, candidates) if candidates else set()
+    for result in results:
+        if result.status == "created" and result.name not in inserted:
+            result.status = "duplicate"
+            result.detail = "Fruit already exists"
     
+    if inserted:
+        if fruit_index is not None:
+            # Bulk writes aren't patched row by row: drop the copy, the next list read reloads it
+            await fruit_index.reset()
+        # Invalidate cache once for the whole import
+        created = [fruit for fruit in candidates if fruit.name in inserted]
+        await invalidate_fruit_cache({fruit.category for fruit in created})
+        await fruit_search.publish_reload(add=[(fruit.name, fruit.category) for fruit in created])
+    
+    return BulkResult(
+        created=len(inserted),
+        duplicates=sum(1 for result in results if result.status == "duplicate"),
+        invalid=sum(1 for result in results if result.status == "invalid"),
+        results=results,
+    )
+
+@app.post("/fruits", dependencies=[Depends(pin_fills_to_primary)])
+async def add_fruit(fruit: Fruit, db: Session = Depends(get_write_db)):
+    if fruit_writes is not None:
+        await fruit_writes.submit(FruitWrite("create", fruit=fruit))
+        return fruit
+    return await add_fruit_now(fruit, db)
+
+@invalidates(tags=[FRUITS_TAG], counters=[CATALOGUE_VERSION_KEY])
+async def add_fruit_now(fruit: Fruit, db: Session):
+    fruit_id, version = await run_in_threadpool(create_fruit, db, fruit)
+    if fruit_index is not None:
+        await fruit_index.upsert(fruit_id, version, fruit.model_dump())
+    await invalidate_categories(fruit.category)
+    await fruit_search.publish(add=[(fruit.name, fruit.category)])
+    return fruit
+
+@app.put("/fruits/{fruit_name}", dependencies=[Depends(pin_fills_to_primary)])
+async def update_fruit(fruit_name: str, fruit: Fruit, db: Session = Depends(get_write_db)):
+    if fruit_writes is not None:
+        await fruit_writes.submit(FruitWrite("update", name=fruit_name, fruit=fruit))
+        return fruit
+    return await update_fruit_now(fruit_name, fruit, db)
+
+@invalidates(tags=[FRUITS_TAG], counters=[CATALOGUE_VERSION_KEY])
+async def update_fruit_now(fruit_name: str, fruit: Fruit, db: Session):
+    fruit_id, version, previous_category = await run_in_threadpool(replace_fruit, db, fruit_name, fruit)
+    if fruit_index is not None:
+        await fruit_index.upsert(fruit_id, version, fruit.model_dump())
+    # A move between categories changes both lists
+    await invalidate_categories(previous_category, fruit.category)
+    await fruit_search.publish(remove=[fruit_name], add=[(fruit.name, fruit.category)])
+    return fruit
+
+@app.delete("/fruits/{fruit_name}", dependencies=[Depends(pin_fills_to_primary)])
+async def delete_fruit(fruit_name: str, db: Session = Depends(get_write_db)):
+    if fruit_writes is not None:
+        await fruit_writes.submit(FruitWrite("delete", name=fruit_name))
+        return {"message": "Fruit deleted"}
+    return await delete_fruit_now(fruit_name, db)
+
+@invalidates(tags=[FRUITS_TAG], counters=[CATALOGUE_VERSION_KEY])
+async def delete_fruit_now(fruit_name: str, db: Session):
+    fruit_id, version, category = await run_in_threadpool(remove_fruit, db, fruit_name)
+    if fruit_index is not None:
+        await fruit_index.remove(fruit_id, version)
+    await invalidate_categories(category)
+    await fruit_search.publish(remove=[fruit_name])
     return {"message": "Fruit deleted"}
 
+@app.get("/stats/cache")
+async def cache_stats():
+    return {
+        **async_redis_client.stats(),
+        "routes": route_cache_stats(),
+        "write_through": fruit_index.stats() if fruit_index is not None else None,
+        "search_index": fruit_search.stats(),
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return metrics_response()
+
+@app.get("/stats/db-pool")
+async def db_pool_stats():
+    return pool_stats()
+
+@app.get("/stats/db-routing")
+async def db_routing_stats():
+    return read_router.stats()
+
+@app.get("/stats/writes")
+async def write_batch_stats():
+    return fruit_writes.stats() if fruit_writes is not None else {"enabled": False}
+
+@app.get("/stats/startup")
+async def startup_stats():
+    return startup_timer.stats()
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,128 @@
+import os
+import time
+
+from fastapi import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+
+# With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty
+# directory: every worker then writes its samples to mmap'd files there and
+# /metrics aggregates them, whichever worker answers the scrape.
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route template", ["method", "route"], buckets=LATENCY_BUCKETS
+)
+REQUESTS = Counter("http_requests_total", "Requests by route template and status", ["method", "route", "status"])
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served", multiprocess_mode="livesum")
+
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by tier and result", ["tier", "result"])
+REDIS_ERRORS = Counter("redis_errors_total", "Failed Redis commands")
+REDIS_CALL_LATENCY = Histogram(
+    "redis_client_call_duration_seconds", "Latency of cache client calls, including round trips", ["op"], buckets=FAST_BUCKETS
+)
+
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use", "Connections checked out of the pool", ["engine"], multiprocess_mode="livesum"
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ["engine"], buckets=FAST_BUCKETS
+)
+DB_POOL_OVERFLOW = Counter("db_pool_overflow_events_total", "Checkouts that opened an overflow connection", ["engine"])
+DB_POOL_TIMEOUTS = Counter("db_pool_checkout_timeouts_total", "Checkouts that timed out waiting for the pool", ["engine"])
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: per-route latency, status codes and in-flight requests.
+
+    Labels use the matched route template (``/fruits/{fruit_name}``), not the
+    raw path, to keep cardinality bounded. Label children are cached so the
+    per-request cost is a couple of dict lookups and two observations.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._latency = {}
+        self._requests = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            latency = self._latency.get((method, path))
+            if latency is None:
+                latency = self._latency[(method, path)] = REQUEST_LATENCY.labels(method, path)
+            latency.observe(elapsed)
+            requests = self._requests.get((method, path, status_code))
+            if requests is None:
+                requests = self._requests[(method, path, status_code)] = REQUESTS.labels(method, path, str(status_code))
+            requests.inc()
+
+def observe_redis(event_name: str, label: str, value: float):
+    if event_name == "call":
+        REDIS_CALL_LATENCY.labels(label).observe(value)
+    elif event_name in ("hits", "misses"):
+        CACHE_LOOKUPS.labels(label, "hit" if event_name == "hits" else "miss").inc()
+    elif event_name == "errors":
+        REDIS_ERRORS.inc()
+
+def observe_pool(event_name: str, engine: str, value: float):
+    if event_name == "checkout":
+        DB_POOL_CHECKOUT_WAIT.labels(engine).observe(value)
+    elif event_name == "overflow":
+        DB_POOL_OVERFLOW.labels(engine).inc()
+    elif event_name == "timeout":
+        DB_POOL_TIMEOUTS.labels(engine).inc()
+
+def instrument_engine(engine, label: str):
+    """Track connections in use with checkout/checkin events.
+
+    Done with inc/dec rather than sampling pool.checkedout() at scrape time,
+    so the livesum across workers is correct no matter who is scraped.
+    """
+    in_use = DB_POOL_IN_USE.labels(label)
+    event.listen(engine, "checkout", lambda *args: in_use.inc())
+    event.listen(engine, "checkin", lambda *args: in_use.dec())
+
+def metrics_response() -> Response:
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+def mark_worker_dead():
+    # Drops this worker's live gauges from the aggregated view
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -2,10 +2,255 @@ import requests
 import time
 import statistics
 import json
-from typing import List, Dict
+import argparse
+import asyncio
+import itertools
+import math
+import random
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
 import matplotlib.pyplot as plt
 import os
 
+class LatencyHistogram:
+    """HDR-style latency histogram with constant memory.
+
+    Values are recorded in microseconds into log-linear buckets (1024
+    sub-buckets per power of two), so any percentile is accurate to ~0.1%
+    however many samples are recorded.
+    """
+
+    SUB_BUCKET_BITS = 10
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.total = 0
+        self.sum_ms = 0.0
+        self.min_ms = math.inf
+        self.max_ms = 0.0
+
+    def record(self, value_ms: float):
+        micros = max(1, int(value_ms * 1000))
+        shift = max(0, micros.bit_length() - self.SUB_BUCKET_BITS)
+        self.counts[(shift, micros >> shift)] += 1
+        self.total += 1
+        self.sum_ms += value_ms
+        self.min_ms = min(self.min_ms, value_ms)
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def percentile(self, p: float) -> float:
+        if not self.total:
+            return 0.0
+        target = max(1, math.ceil(p / 100 * self.total))
+        seen = 0
+        for shift, sub_bucket in sorted(self.counts, key=lambda bucket: bucket[1] << bucket[0]):
+            seen += self.counts[(shift, sub_bucket)]
+            if seen >= target:
+                # Report the bucket's upper edge, as HdrHistogram does
+                return min((((sub_bucket + 1) << shift) - 1) / 1000, self.max_ms)
+        return self.max_ms
+
+    @property
+    def mean_ms(self) -> float:
+        return self.sum_ms / self.total if self.total else 0.0
+
+@dataclass
+class Scenario:
+    name: str
+    weight: float
+    method: str
+    # Returns (path, json body) for the next request, or None if it can't run yet
+    build: Callable[[], Optional[tuple]]
+    # Called with the request body once the server has accepted it
+    on_success: Optional[Callable[[dict], None]] = None
+
+class AsyncLoadGenerator:
+    """Concurrent load against every /fruits route with httpx + asyncio.
+
+    Closed loop: ``concurrency`` workers each send their next request as soon
+    as the previous one finishes.
+
+    Open loop: requests are started on a fixed schedule at ``rate`` per second
+    whether or not earlier ones have finished, and latency is measured from
+    the *intended* start time. A slow server therefore shows up as queueing
+    delay instead of silently lowering the offered load (coordinated omission).
+    """
+
+    MIXES = {
+        "read-only": {"list": 1.0},
+        "read-heavy": {"list": 0.8, "page": 0.1, "add": 0.04, "update": 0.03, "delete": 0.03},
+        "write-heavy": {"list": 0.4, "page": 0.1, "add": 0.2, "update": 0.15, "delete": 0.15},
+    }
+
+    def __init__(self, base_url: str = "http://localhost:8000", mix: str = "read-heavy", page_size: int = 50, max_in_flight: int = 10000):
+        self.base_url = base_url
+        self.page_size = page_size
+        self.max_in_flight = max_in_flight
+        self.run_id = int(time.time())
+        self._names = itertools.count()
+        self._created: deque = deque()
+        builders = {
+            "list": ("GET", lambda: ("/fruits", None)),
+            "page": ("GET", lambda: (f"/fruits?limit={self.page_size}", None)),
+            "add": ("POST", self._add),
+            "update": ("PUT", self._update),
+            "delete": ("DELETE", self._delete),
+        }
+        self.scenarios = [
+            Scenario(name, weight, builders[name][0], builders[name][1], self._added if name == "add" else None)
+            for name, weight in self.MIXES[mix].items()
+        ]
+        self.histograms: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self.samples: Dict[str, list] = defaultdict(list)
+        self.sent = Counter()
+
+    def _add(self):
+        name = f"load_{self.run_id}_{next(self._names)}"
+        return "/fruits", {"name": name, "category": "load-test"}
+
+    def _added(self, body: dict):
+        # Only fruits that exist are updated or deleted later
+        self._created.append(body["name"])
+
+    def _update(self):
+        if not self._created:
+            return None
+        name = self._created[0]
+        self._created.rotate(-1)
+        return f"/fruits/{name}", {"name": name, "category": random.choice(["load-a", "load-b"])}
+
+    def _delete(self):
+        if not self._created:
+            return None
+        return f"/fruits/{self._created.popleft()}", None
+
+    def _choose(self) -> Scenario:
+        return random.choices(self.scenarios, weights=[s.weight for s in self.scenarios])[0]
+
+    def _pick(self) -> tuple:
+        scenario = self._choose()
+        request = scenario.build()
+        if request is None:
+            # Nothing to update/delete yet: fall back to a read
+            scenario = self.scenarios[0]
+            request = scenario.build()
+        return scenario, request
+
+    def _record(self, scenario: str, latency_ms: float, error: Optional[str]):
+        self.sent[scenario] += 1
+        if error is not None:
+            self.errors[scenario][error] += 1
+            return
+        self.histograms[scenario].record(latency_ms)
+        # Keep a bounded reservoir of raw samples for the report and charts
+        samples = self.samples[scenario]
+        if len(samples) < 5000:
+            samples.append(latency_ms)
+        else:
+            index = random.randrange(self.histograms[scenario].total)
+            if index < 5000:
+                samples[index] = latency_ms
+
+    async def _send(self, client, scenario: Scenario, request: tuple, intended_start: float):
+        path, body = request
+        error = None
+        try:
+            response = await client.request(scenario.method, path, json=body)
+            if response.status_code >= 400:
+                error = f"HTTP {response.status_code}"
+            elif response.status_code < 300 and scenario.on_success is not None:
+                scenario.on_success(body)
+        except Exception as e:
+            error = type(e).__name__
+        self._record(scenario.name, (time.perf_counter() - intended_start) * 1000, error)
+
+    async def run(self, duration: float, concurrency: Optional[int] = None, rate: Optional[float] = None) -> Dict:
+        import httpx
+
+        limits = httpx.Limits(max_connections=concurrency or self.max_in_flight, max_keepalive_connections=concurrency or 100)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=30, limits=limits) as client:
+            start = time.perf_counter()
+            deadline = start + duration
+            if rate:
+                await self._open_loop(client, rate, start, deadline)
+            else:
+                await asyncio.gather(*[self._closed_loop(client, deadline) for _ in range(concurrency or 10)])
+            elapsed = time.perf_counter() - start
+        return self.summary(elapsed, concurrency=concurrency, rate=rate)
+
+    async def _closed_loop(self, client, deadline: float):
+        while time.perf_counter() < deadline:
+            scenario, request = self._pick()
+            await self._send(client, scenario, request, time.perf_counter())
+
+    async def _open_loop(self, client, rate: float, start: float, deadline: float):
+        interval = 1 / rate
+        in_flight = set()
+        for i in itertools.count():
+            intended_start = start + i * interval
+            if intended_start >= deadline:
+                break
+            delay = intended_start - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(in_flight) >= self.max_in_flight:
+                # Client-side saturation: count it rather than stall the schedule.
+                # Nothing is built, so no fruit is taken for a request never sent
+                self._record(self._choose().name, 0, "dropped (client saturated)")
+                continue
+            scenario, request = self._pick()
+            task = asyncio.create_task(self._send(client, scenario, request, intended_start))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        if in_flight:
+            await asyncio.gather(*in_flight)
+
+    def summary(self, elapsed: float, concurrency: Optional[int] = None, rate: Optional[float] = None) -> Dict:
+        overall = LatencyHistogram()
+        for histogram in self.histograms.values():
+            for bucket, count in histogram.counts.items():
+                overall.counts[bucket] += count
+            overall.total += histogram.total
+            overall.sum_ms += histogram.sum_ms
+            overall.min_ms = min(overall.min_ms, histogram.min_ms)
+            overall.max_ms = max(overall.max_ms, histogram.max_ms)
+        all_samples = [value for samples in self.samples.values() for value in samples]
+        errors = Counter()
+        for scenario_errors in self.errors.values():
+            errors.update(scenario_errors)
+
+        def describe(histogram: LatencyHistogram, sent: int, samples: list, scenario_errors: Counter) -> Dict:
+            return {
+                "requests_sent": sent,
+                "successful_requests": histogram.total,
+                "achieved_rps": histogram.total / elapsed if elapsed else 0.0,
+                "avg_time_ms": histogram.mean_ms,
+                "median_time_ms": histogram.percentile(50),
+                "min_time_ms": histogram.min_ms if histogram.total else 0.0,
+                "max_time_ms": histogram.max_ms,
+                "std_dev_ms": statistics.stdev(samples) if len(samples) > 1 else 0,
+                "p50_ms": histogram.percentile(50),
+                "p90_ms": histogram.percentile(90),
+                "p99_ms": histogram.percentile(99),
+                "p999_ms": histogram.percentile(99.9),
+                "errors": dict(scenario_errors),
+            }
+
+        return {
+            "mode": "open-loop" if rate else "closed-loop",
+            "target_rps": rate,
+            "concurrency": concurrency,
+            "duration_s": elapsed,
+            **describe(overall, sum(self.sent.values()), all_samples, errors),
+            "all_times": all_samples,
+            "scenarios": {
+                name: describe(self.histograms[name], self.sent[name], self.samples[name], self.errors[name])
+                for name in self.sent
+            },
+        }
+
 class PerformanceTester:
     def __init__(self, base_url: str = "http://localhost:8000"):
         self.base_url = base_url
@@ -75,6 +320,29 @@ class PerformanceTester:
         self.results[test_name] = result
         return result
     
+    def run_load_test(self, test_name: str, duration: float = 30, concurrency: Optional[int] = None, rate: Optional[float] = None, mix: str = "read-heavy") -> Dict:
+        """Run a concurrent (closed loop) or fixed-rate (open loop) load test"""
+        print(f"\n🔥 Running {test_name}...")
+        if rate:
+            print(f"   Open loop at {rate:.0f} req/s for {duration:.0f}s ({mix})")
+        else:
+            print(f"   Closed loop with {concurrency} concurrent clients for {duration:.0f}s ({mix})")
+        
+        generator = AsyncLoadGenerator(self.base_url, mix=mix)
+        summary = asyncio.run(generator.run(duration, concurrency=concurrency, rate=rate))
+        
+        result = {
+            "test_name": test_name,
+            "endpoint": "/fruits*",
+            "method": mix,
+            "iterations": summary["requests_sent"],
+            **summary,
+        }
+        if not result["successful_requests"]:
+            result["error"] = "No successful requests"
+        self.results[test_name] = result
+        return result
+    
     def test_cache_behavior(self):
         """Test cache hit vs cache miss behavior"""
         print("\n🎯 Testing Cache Behavior...")
@@ -111,6 +379,9 @@ class PerformanceTester:
         print("=" * 60)
         
         for test_name, result in self.results.items():
+            if "error" in result and not result.get("successful_requests"):
+                print(f"\n🧪 {test_name.upper()}: {result['error']}")
+                continue
             print(f"\n🧪 {test_name.upper()}")
             print(f"   Endpoint: {result['method']} {result['endpoint']}")
             print(f"   Success Rate: {result['successful_requests']}/{result['iterations']} ({result['successful_requests']/result['iterations']*100:.1f}%)")
@@ -119,6 +390,13 @@ class PerformanceTester:
             print(f"   Min Time: {result['min_time_ms']:.2f}ms")
             print(f"   Max Time: {result['max_time_ms']:.2f}ms")
             print(f"   Std Dev: {result['std_dev_ms']:.2f}ms")
+            if "p99_ms" in result:
+                print(f"   Mode: {result['mode']} - achieved {result['achieved_rps']:.1f} req/s")
+                print(f"   p50/p90/p99/p99.9: {result['p50_ms']:.2f} / {result['p90_ms']:.2f} / {result['p99_ms']:.2f} / {result['p999_ms']:.2f}ms")
+                if result["errors"]:
+                    print(f"   Errors: {result['errors']}")
+                for name, scenario in result["scenarios"].items():
+                    print(f"     {name:<8} {scenario['successful_requests']:>7} ok  p50 {scenario['p50_ms']:.2f}ms  p99 {scenario['p99_ms']:.2f}ms  errors {sum(scenario['errors'].values())}")
         
         # Save report to file
         if save_to_file:
@@ -142,7 +420,7 @@ class PerformanceTester:
             fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
             
             # Plot 1: Average response times
-            test_names = list(self.results.keys())
+            test_names = [name for name in self.results if self.results[name].get("all_times")]
             avg_times = [self.results[name]["avg_time_ms"] for name in test_names]
             
             bars = ax1.bar(test_names, avg_times, color=['#3498db', '#e74c3c', '#2ecc71'])
@@ -174,9 +452,38 @@ class PerformanceTester:
         except Exception as e:
             print(f"⚠️  Error creating charts: {e}")
 
+def run_load_tests(args):
+    """Run the concurrent load generator instead of the serial tests"""
+    tester = PerformanceTester(args.base_url)
+    
+    print("🚀 Starting FastAPI Load Test")
+    print("=" * 50)
+    
+    if args.rate:
+        test_name = f"Open loop {args.rate:.0f} rps ({args.mix})"
+    else:
+        test_name = f"Closed loop x{args.concurrency} ({args.mix})"
+    tester.run_load_test(test_name, duration=args.duration, concurrency=args.concurrency, rate=args.rate, mix=args.mix)
+    
+    tester.generate_report()
+    tester.plot_results()
+
 def main():
     """Main function to run performance tests"""
-    tester = PerformanceTester()
+    parser = argparse.ArgumentParser(description="Performance tests for the fruits API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--load", action="store_true", help="Run the concurrent load generator instead of the serial tests")
+    parser.add_argument("--concurrency", type=int, default=50, help="Closed loop: number of concurrent clients")
+    parser.add_argument("--rate", type=float, help="Open loop: fixed arrival rate in requests/second")
+    parser.add_argument("--duration", type=float, default=30, help="Load test duration in seconds")
+    parser.add_argument("--mix", choices=sorted(AsyncLoadGenerator.MIXES), default="read-heavy")
+    args = parser.parse_args()
+    
+    if args.load:
+        run_load_tests(args)
+        return
+    
+    tester = PerformanceTester(args.base_url)
     
     print("🚀 Starting FastAPI Redis Performance Test")
     print("=" * 50)
@@ -0,0 +1,166 @@
+"""In-process prefix index over fruit names for type-ahead search.
+
+Entries are kept in a sorted Python list of ``(casefolded name, name,
+category)`` tuples, so a prefix query is one bisect plus a slice:
+O(log n + limit) whatever the catalogue size. Writers publish the names
+they add and remove on FRUIT_EVENTS_CHANNEL and every worker patches its
+copy in place; a missed event (listener disconnect, bulk import) marks the
+index stale and it is reloaded in the background while the old copy keeps
+serving.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from bisect import bisect_left, insort
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple
+
+from redis_client import async_redis_client
+
+logger = logging.getLogger(__name__)
+
+FRUIT_EVENTS_CHANNEL = os.getenv("FRUIT_EVENTS_CHANNEL", "fruits:events")
+# Reload at least this often even if no event was missed (seconds, 0 = never)
+SEARCH_INDEX_MAX_AGE = float(os.getenv("SEARCH_INDEX_MAX_AGE", "300"))
+# Past this many names one re-sort beats inserting them one at a time
+BULK_APPLY_THRESHOLD = 64
+
+Entry = Tuple[str, str, Optional[str]]
+Loader = Callable[[], Awaitable[Iterable[Tuple[str, Optional[str]]]]]
+
+def _entry(name: str, category: Optional[str]) -> Entry:
+    return (name.casefold(), name, category)
+
+class PrefixIndex:
+    """Sorted array of names answering prefix queries with a bisect."""
+
+    def __init__(self, load: Loader, channel: str = FRUIT_EVENTS_CHANNEL, client=async_redis_client, max_age: float = SEARCH_INDEX_MAX_AGE):
+        self.load = load
+        self.channel = channel
+        self.client = client
+        self.max_age = max_age
+        self._entries: List[Entry] = []
+        self._loaded_at: Optional[float] = None
+        self._stale = False
+        self._loading: Optional[asyncio.Task] = None
+        # Events received while a load is running, replayed on its result
+        self._replay: Optional[list] = None
+        self.counters = {"searches": 0, "loads": 0, "events": 0}
+
+    def start(self):
+        """Subscribe to write events; call once Redis is connected."""
+        self.client.subscribe(self.channel, self._on_message, on_gap=self.invalidate)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _find(self, name: str) -> Optional[int]:
+        folded = name.casefold()
+        i = bisect_left(self._entries, (folded,))
+        while i < len(self._entries) and self._entries[i][0] == folded:
+            if self._entries[i][1] == name:
+                return i
+            i += 1
+        return None
+
+    def apply(self, remove: Iterable[str] = (), add: Iterable[Tuple[str, Optional[str]]] = ()):
+        """Remove then add names; idempotent, so echoes of our own events are harmless."""
+        remove, add = list(remove), list(add)
+        if self._replay is not None:
+            self._replay.append((remove, add))
+        for name in remove:
+            i = self._find(name)
+            if i is not None:
+                del self._entries[i]
+        if len(add) > BULK_APPLY_THRESHOLD:
+            names = {name for name, category in add}
+            kept = [entry for entry in self._entries if entry[1] not in names]
+            self._entries = sorted(kept + [_entry(name, category) for name, category in add])
+            return
+        for name, category in add:
+            i = self._find(name)
+            if i is not None:
+                del self._entries[i]
+            insort(self._entries, _entry(name, category))
+
+    def invalidate(self):
+        self._stale = True
+
+    def _on_message(self, message: bytes):
+        try:
+            event = json.loads(message)
+        except ValueError:
+            logger.warning(f"Ignoring malformed fruit event: {message!r}")
+            return
+        self.counters["events"] += 1
+        if event.get("reload"):
+            self.invalidate()
+            return
+        self.apply(event.get("remove", ()), [tuple(item) for item in event.get("add", ())])
+
+    async def publish(self, remove: Iterable[str] = (), add: Iterable[Tuple[str, Optional[str]]] = ()):
+        """Apply a write locally and tell the other workers about it."""
+        remove, add = list(remove), list(add)
+        self.apply(remove, add)
+        if not await self.client.publish(self.channel, json.dumps({"remove": remove, "add": add})):
+            # Other workers may never see this write
+            logger.warning("⚠️ Could not publish fruit event - other workers will catch up on reload")
+
+    async def publish_reload(self, add: Iterable[Tuple[str, Optional[str]]] = ()):
+        """Have every worker reload, after applying ``add`` here so our own searches see it at once."""
+        self.apply(add=add)
+        self.invalidate()
+        if not await self.client.publish(self.channel, json.dumps({"reload": True})):
+            logger.warning("⚠️ Could not publish fruit reload event")
+
+    async def _reload(self):
+        start = time.perf_counter()
+        self._replay = []
+        self._stale = False
+        try:
+            rows = await self.load()
+            entries = sorted(_entry(name, category) for name, category in rows)
+        except Exception as e:
+            # Keep serving what we have; the next search tries again
+            self._stale = True
+            logger.error(f"Search index load failed: {e}")
+            return
+        finally:
+            replay, self._replay = self._replay, None
+        self._entries = entries
+        # Writes seen while the snapshot was read are applied on top of it
+        for remove, add in replay:
+            self.apply(remove, add)
+        self._loaded_at = time.monotonic()
+        self.counters["loads"] += 1
+        logger.info(f"🔎 Search index loaded {len(entries)} names in {(time.perf_counter() - start) * 1000:.2f}ms")
+
+    def _refresh(self) -> asyncio.Task:
+        if self._loading is None or self._loading.done():
+            self._loading = asyncio.create_task(self._reload())
+        return self._loading
+
+    async def search(self, prefix: str, limit: int = 10) -> List[Tuple[str, Optional[str]]]:
+        if self._loaded_at is None:
+            # Nothing to serve yet: wait for the first load
+            await asyncio.shield(self._refresh())
+        elif self._stale or (self.max_age and time.monotonic() - self._loaded_at > self.max_age):
+            self._refresh()
+        self.counters["searches"] += 1
+        folded = prefix.casefold()
+        i = bisect_left(self._entries, (folded,))
+        results = []
+        for key, name, category in self._entries[i:i + limit]:
+            if not key.startswith(folded):
+                break
+            results.append((name, category))
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "names": len(self._entries),
+            "stale": self._stale,
+            "age_seconds": time.monotonic() - self._loaded_at if self._loaded_at is not None else None,
+            **self.counters,
+        }
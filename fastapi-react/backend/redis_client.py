@@ -1,93 +1,737 @@
+import asyncio
+import contextvars
+import functools
 import redis
+import redis.asyncio as aioredis
 import json
 import logging
-from typing import Optional, Any
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Sequence
 from dotenv import load_dotenv
 import os
 
+from cache_codecs import codec_from_env
+from circuit_breaker import CircuitBreaker
+from env import env_flag
+from local_cache import LocalCache
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-class RedisClient:
-    def __init__(self):
-        self.redis_client: Optional[redis.Redis] = None
-        self._connect()
-    
-    def _connect(self):
-        try:
-            redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-            self.redis_client = redis.from_url(
-                redis_url,
-                decode_responses=True,
-                socket_connect_timeout=5,
-                socket_timeout=5,
-                retry_on_timeout=True
-            )
-            # Test connection
-            self.redis_client.ping()
-            logger.info("✅ Successfully connected to Redis!")
-        except Exception as e:
-            logger.error(f"❌ Failed to connect to Redis: {e}")
-            self.redis_client = None
-    
+# Errors that say something about the health of the connection. Anything
+# else (e.g. a bad reply or a JSON error) means Redis answered.
+CONNECTION_ERRORS = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError, OSError)
+
+# Workers publish deleted keys here so every process drops its L1 copy
+INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
+
+_MISSING = object()
+
+# Whether the client call running in this context holds the breaker's
+# half-open probe slot
+_holds_probe: contextvars.ContextVar[bool] = contextvars.ContextVar("redis_holds_probe", default=False)
+
+# Compare-and-delete so a worker never releases a lock another worker now holds
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Registers a cache key under each tag set (KEYS) and makes sure the tag set
+# lives at least as long as the key (ARGV[2] seconds)
+TAG_KEY_SCRIPT = """
+for _, tag in ipairs(KEYS) do
+    redis.call("sadd", tag, ARGV[1])
+    if redis.call("ttl", tag) < tonumber(ARGV[2]) then
+        redis.call("expire", tag, ARGV[2])
+    end
+end
+return #KEYS
+"""
+
+# How long startup waits for the first PING before serving without it (seconds)
+REDIS_CONNECT_WAIT = float(os.getenv("REDIS_CONNECT_WAIT", "1"))
+
+# Keys deleted per pipeline round trip when invalidating
+INVALIDATION_BATCH_SIZE = int(os.getenv("CACHE_INVALIDATION_BATCH_SIZE", "500"))
+
+def tag_key(tag: str) -> str:
+    return f"tag:{tag}"
+
+def _key_names(keys: list) -> List[str]:
+    return [key.decode("utf-8") if isinstance(key, bytes) else key for key in keys]
+
+def _counter_seed() -> int:
+    # Counters start from the clock rather than 0 so they keep increasing
+    # even if Redis loses the key (flush, failover without persistence)
+    return int(time.time() * 1000)
+
+def _connection_options() -> dict:
+    socket_timeout = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+    # Bytes mode: values go through the cache codec, which may not produce UTF-8
+    return {
+        "decode_responses": False,
+        "socket_connect_timeout": socket_timeout,
+        "socket_timeout": socket_timeout,
+        "retry_on_timeout": True,
+    }
+
+class _BlockingPool(aioredis.BlockingConnectionPool):
+    """Waits up to ``timeout`` for a free connection instead of failing at once.
+
+    Running out of connections is a load problem, not a dead Redis, so the
+    wait timing out raises MaxConnectionsError, which the breaker ignores.
+    """
+
+    async def get_connection(self, *args, **kwargs):
+        try:
+            return await super().get_connection(*args, **kwargs)
+        except redis.exceptions.ConnectionError as e:
+            if isinstance(e.__cause__, asyncio.TimeoutError):
+                raise redis.exceptions.MaxConnectionsError(f"No Redis connection free within {self.timeout}s") from e
+            raise
+
+def _create_breaker(name: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        name,
+        failure_threshold=int(os.getenv("REDIS_BREAKER_FAILURE_THRESHOLD", "5")),
+        probe_interval=float(os.getenv("REDIS_BREAKER_PROBE_INTERVAL", "10")),
+        success_threshold=int(os.getenv("REDIS_BREAKER_SUCCESS_THRESHOLD", "1")),
+    )
+
+def _create_local_cache() -> Optional[LocalCache]:
+    if not env_flag("CACHE_L1_ENABLED"):
+        return None
+    return LocalCache(
+        max_entries=int(os.getenv("CACHE_L1_MAX_ENTRIES", "1024")),
+        max_bytes=int(os.getenv("CACHE_L1_MAX_BYTES", str(64 * 1024 * 1024))),
+        ttl=float(os.getenv("CACHE_L1_TTL", "30")),
+    )
+
+def _timed(op: str):
+    """Report the duration of a client call to the registered observers.
+
+    A cancelled call never reaches record_success/record_failure, so if it
+    was the half-open probe it hands the probe slot back here instead.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(self, *args, **kwargs):
+            start = time.perf_counter()
+            holds_probe = _holds_probe.set(False)
+            try:
+                return await fn(self, *args, **kwargs)
+            except asyncio.CancelledError:
+                if _holds_probe.get():
+                    self.breaker.release()
+                raise
+            finally:
+                _holds_probe.reset(holds_probe)
+                if self.observers:
+                    self._notify("call", op, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+class AsyncRedisClient:
+    """Redis client backed by a sized asyncio connection pool.
+
+    The pool is opened with ``connect()`` and released with ``close()``; both are
+    called from the application's lifespan hook.
+
+    Health is tracked passively from the outcome of real commands instead of
+    a PING before each one; the breaker turns a dead Redis into an instant
+    cache miss. When ``CACHE_L1_ENABLED`` is set, reads are served from an
+    in-process LocalCache first, and deletes and overwrites are broadcast on
+    INVALIDATION_CHANNEL so every other worker drops its copy.
+    """
+
+    def __init__(self, max_connections: Optional[int] = None):
+        self.redis_client = None
+        self.max_connections = max_connections or int(os.getenv("REDIS_POOL_SIZE", "50"))
+        self.pool: Optional[aioredis.ConnectionPool] = None
+        self._listeners: List[asyncio.Task] = []
+        self._ping_task: Optional[asyncio.Task] = None
+        self.breaker = _create_breaker("redis-async")
+        self.local_cache = _create_local_cache()
+        # Tags our own invalidation messages, so a worker doesn't drop what it just wrote
+        self._origin = uuid.uuid4().hex
+        self.codec = codec_from_env()
+        self.counters = {"hits": 0, "misses": 0, "errors": 0}
+        # Callables taking (event, label, value); used to export metrics
+        self.observers: List[Callable[[str, str, float], None]] = []
+        self.invalidations = {
+            mode: {"calls": 0, "keys": 0, "seconds": 0.0}
+            for mode in ("tags", "pattern")
+        }
+
     def is_connected(self) -> bool:
-        if not self.redis_client:
+        return self.redis_client is not None and self.breaker.state != CircuitBreaker.OPEN
+
+    def _acquire(self) -> bool:
+        if self.redis_client is None:
             return False
+        admitted = self.breaker.admit()
+        if admitted:
+            _holds_probe.set(True)
+        return admitted is not None
+
+    def _notify(self, event: str, label: str, value: float = 0.0):
+        for observer in self.observers:
+            observer(event, label, value)
+
+    def _count(self, name: str, tier: str = "l2"):
+        self.counters[name] += 1
+        if self.observers:
+            self._notify(name, tier)
+
+    def _record_error(self, e: Exception):
+        self._count("errors")
+        if isinstance(e, redis.exceptions.MaxConnectionsError):
+            # Pool exhausted by a burst: no verdict on Redis itself
+            if _holds_probe.get():
+                self.breaker.release()
+        elif isinstance(e, CONNECTION_ERRORS):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def _l1_get(self, key: str) -> Any:
+        if self.local_cache is None:
+            return _MISSING
+        value = self.local_cache.get(key, _MISSING)
+        if self.observers:
+            self._notify("misses" if value is _MISSING else "hits", "l1")
+        return value
+
+    def _l1_set(self, key: str, value: Any, size: int, expire: Optional[int] = None):
+        # L1 entries live at most CACHE_L1_TTL, which bounds staleness if an
+        # invalidation message is missed
+        if self.local_cache is not None:
+            self.local_cache.set(key, value, size, ttl=expire)
+
+    def _invalidation_message(self, **target) -> str:
+        return json.dumps({**target, "origin": self._origin})
+
+    def _l1_delete(self, key: str) -> Optional[str]:
+        """Drop ``key`` locally and return the message to broadcast, if any."""
+        if self.local_cache is None:
+            return None
+        self.local_cache.delete([key])
+        return self._invalidation_message(keys=[key])
+
+    def _l1_delete_pattern(self, pattern: str) -> Optional[str]:
+        if self.local_cache is None:
+            return None
+        self.local_cache.delete_pattern(pattern)
+        return self._invalidation_message(pattern=pattern)
+
+    def _l1_get_many(self, keys: Sequence[str]) -> tuple:
+        """Return the values found locally (None elsewhere) and the indexes still to fetch."""
+        values: List[Optional[Any]] = [None] * len(keys)
+        missing = []
+        for i, key in enumerate(keys):
+            value = self._l1_get(key)
+            if value is _MISSING:
+                missing.append(i)
+            else:
+                values[i] = value
+        return values, missing
+
+    def _fill_many(self, keys: Sequence[str], values: list, missing: List[int], found: list):
+        for i, data in zip(missing, found):
+            if data is None:
+                self._count("misses")
+                continue
+            self._count("hits")
+            values[i] = self.codec.decode(data)
+            self._l1_set(keys[i], values[i], len(data))
+
+    def _pipeline_set_many(self, items: Dict[str, Any], expire: int, ttls: Optional[Dict[str, int]], tags: Sequence[str]):
+        ttls = ttls or {}
+        pipe = self.redis_client.pipeline(transaction=False)
+        sizes = {}
+        for key, value in items.items():
+            data = self.codec.encode(value)
+            sizes[key] = len(data)
+            key_expire = ttls.get(key, expire)
+            pipe.setex(key, key_expire, data)
+            if tags:
+                pipe.eval(TAG_KEY_SCRIPT, len(tags), *[tag_key(tag) for tag in tags], key, key_expire)
+        if self.local_cache is not None:
+            # Other workers may hold the values being replaced
+            pipe.publish(INVALIDATION_CHANNEL, self._invalidation_message(keys=list(items)))
+        return pipe, sizes
+
+    def _l1_set_many(self, items: Dict[str, Any], sizes: Dict[str, int], expire: int, ttls: Optional[Dict[str, int]]):
+        for key, value in items.items():
+            self._l1_set(key, value, sizes[key], (ttls or {}).get(key, expire))
+
+    def _record_invalidation(self, mode: str, target: str, removed: int, elapsed: float):
+        stats = self.invalidations[mode]
+        stats["calls"] += 1
+        stats["keys"] += removed
+        stats["seconds"] += elapsed
+        logger.info(f"🗑️ Invalidated {removed} keys for {mode} {target} in {elapsed * 1000:.2f}ms")
+
+    def _apply_invalidation(self, message: str):
         try:
-            self.redis_client.ping()
-            return True
-        except:
-            return False
-    
-    def get(self, key: str) -> Optional[Any]:
-        if not self.is_connected():
+            data = json.loads(message)
+        except ValueError:
+            logger.warning(f"Ignoring malformed invalidation message: {message!r}")
+            return
+        if data.get("origin") == self._origin:
+            return
+        if "keys" in data:
+            self.local_cache.delete(data["keys"])
+        if "pattern" in data:
+            self.local_cache.delete_pattern(data["pattern"])
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            "l1": self.local_cache.stats() if self.local_cache is not None else None,
+            "l2": {
+                **self.counters,
+                "hit_ratio": self.counters["hits"] / lookups if lookups else 0.0,
+            },
+            "invalidations": self.invalidations,
+            "codec": self.codec.describe(),
+            "circuit_breaker": self.breaker.stats(),
+        }
+
+    async def connect(self, wait: float = REDIS_CONNECT_WAIT):
+        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+        self.pool = _BlockingPool.from_url(
+            redis_url,
+            max_connections=self.max_connections,
+            timeout=float(os.getenv("REDIS_POOL_TIMEOUT", "1")),
+            **_connection_options()
+        )
+        self.redis_client = aioredis.Redis(connection_pool=self.pool)
+        self._ping_task = asyncio.create_task(self._ping())
+        try:
+            # A slow or dead Redis must not hold up startup: the ping carries on
+            # in the background and its outcome lands in the breaker
+            await asyncio.wait_for(asyncio.shield(self._ping_task), wait)
+        except asyncio.TimeoutError:
+            logger.warning(f"⏳ Redis did not answer within {wait}s - starting without it")
+        if self.local_cache is not None:
+            self.subscribe(INVALIDATION_CHANNEL, self._apply_invalidation, on_gap=self.local_cache.clear)
+
+    async def _ping(self):
+        try:
+            await self.redis_client.ping()
+            self.breaker.record_success()
+            logger.info(f"✅ Successfully connected to Redis (async pool, max {self.max_connections} connections)!")
+        except Exception as e:
+            # Keep the pool: the breaker probes again once Redis is back
+            logger.error(f"❌ Failed to connect to Redis (async): {e}")
+            self._record_error(e)
+
+    def subscribe(self, channel: str, handler: Callable[[bytes], None], on_gap: Optional[Callable[[], None]] = None):
+        """Call ``handler`` with every message published on ``channel`` until close().
+
+        Messages published while the subscription is down are lost, so
+        ``on_gap`` is called after every disconnect to let the subscriber
+        resynchronise.
+        """
+        self._listeners.append(asyncio.create_task(self._listen(channel, handler, on_gap)))
+
+    async def _listen(self, channel: str, handler: Callable[[bytes], None], on_gap: Optional[Callable[[], None]]):
+        while True:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(channel)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        handler(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis listener error on {channel}: {e}")
+                if on_gap is not None:
+                    on_gap()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def close(self):
+        if self._ping_task is not None:
+            self._ping_task.cancel()
+            try:
+                await self._ping_task
+            except asyncio.CancelledError:
+                pass
+            self._ping_task = None
+        for listener in self._listeners:
+            listener.cancel()
+            try:
+                await listener
+            except asyncio.CancelledError:
+                pass
+        self._listeners = []
+        if self.redis_client is not None:
+            await self.redis_client.aclose()
+        if self.pool is not None:
+            await self.pool.disconnect()
+        self.redis_client = None
+        self.pool = None
+
+    @_timed("get")
+    async def get(self, key: str) -> Optional[Any]:
+        value = self._l1_get(key)
+        if value is not _MISSING:
+            return value
+        if not self._acquire():
             logger.warning("Redis not connected - returning None (cache miss)")
             return None
         try:
-            data = self.redis_client.get(key)
+            data = await self.redis_client.get(key)
+            self.breaker.record_success()
             if data:
+                self._count("hits")
                 logger.info(f"🎯 Cache HIT for key: {key}")
-                return json.loads(data)
+                value = self.codec.decode(data)
+                self._l1_set(key, value, len(data))
+                return value
+            self._count("misses")
             logger.info(f"❌ Cache MISS for key: {key}")
             return None
         except Exception as e:
+            self._record_error(e)
             logger.error(f"Redis get error: {e}")
             return None
-    
-    def set(self, key: str, value: Any, expire: int = 3600) -> bool:
-        if not self.is_connected():
+
+    @_timed("set")
+    async def set(self, key: str, value: Any, expire: int = 3600, tags: Sequence[str] = ()) -> bool:
+        if not self._acquire():
             logger.warning("Redis not connected - cache not set")
             return False
         try:
-            serialized = json.dumps(value, default=str)
-            result = self.redis_client.setex(key, expire, serialized)
+            serialized = self.codec.encode(value)
+            result = await self._setex(key, expire, serialized, tags)
+            self.breaker.record_success()
+            self._l1_set(key, value, len(serialized), expire)
             logger.info(f"💾 Cache SET for key: {key} (expire: {expire}s)")
             return result
         except Exception as e:
+            self._record_error(e)
             logger.error(f"Redis set error: {e}")
             return False
-    
-    def delete(self, key: str) -> bool:
-        if not self.is_connected():
+
+    @_timed("delete")
+    async def delete(self, key: str) -> bool:
+        message = self._l1_delete(key)
+        if not self._acquire():
             return False
         try:
-            return bool(self.redis_client.delete(key))
+            if message is None:
+                result = bool(await self.redis_client.delete(key))
+            else:
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.delete(key)
+                pipe.publish(INVALIDATION_CHANNEL, message)
+                result = bool((await pipe.execute())[0])
+            self.breaker.record_success()
+            return result
         except Exception as e:
+            self._record_error(e)
             logger.error(f"Redis delete error: {e}")
             return False
-    
-    def delete_pattern(self, pattern: str) -> int:
-        if not self.is_connected():
+
+    @_timed("get_many")
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[Any]]:
+        """Look up several keys with one MGET; misses come back as None."""
+        values, missing = self._l1_get_many(keys)
+        if not missing or not self._acquire():
+            return values
+        try:
+            found = await self.redis_client.mget([keys[i] for i in missing])
+            self.breaker.record_success()
+            self._fill_many(keys, values, missing, found)
+            return values
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Redis get_many error: {e}")
+            return values
+
+    @_timed("set_many")
+    async def set_many(self, items: Dict[str, Any], expire: int = 3600, ttls: Optional[Dict[str, int]] = None, tags: Sequence[str] = ()) -> bool:
+        """Store several values in one pipeline; ``ttls`` overrides ``expire`` per key."""
+        if not items:
+            return True
+        if not self._acquire():
+            return False
+        try:
+            pipe, sizes = self._pipeline_set_many(items, expire, ttls, tags)
+            results = await pipe.execute()
+            self.breaker.record_success()
+            self._l1_set_many(items, sizes, expire, ttls)
+            # The trailing PUBLISH reports subscribers, not success
+            return all(results[:-1] if self.local_cache is not None else results)
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Redis set_many error: {e}")
+            return False
+
+    @_timed("delete_many")
+    async def delete_many(self, keys: Sequence[str]) -> int:
+        if not keys:
+            return 0
+        if not self._acquire():
+            if self.local_cache is not None:
+                self.local_cache.delete(list(keys))
             return 0
+        deleted = 0
         try:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                return self.redis_client.delete(*keys)
+            for start in range(0, len(keys), INVALIDATION_BATCH_SIZE):
+                deleted += await self._delete_batch(list(keys[start:start + INVALIDATION_BATCH_SIZE]))
+            self.breaker.record_success()
+            return deleted
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Redis delete_many error: {e}")
+            return deleted
+
+    async def _setex(self, key: str, expire: int, data: bytes, tags: Sequence[str]):
+        if not tags and self.local_cache is None:
+            return await self.redis_client.setex(key, expire, data)
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.setex(key, expire, data)
+        if tags:
+            pipe.eval(TAG_KEY_SCRIPT, len(tags), *[tag_key(tag) for tag in tags], key, expire)
+        if self.local_cache is not None:
+            # An overwrite leaves other workers' L1 copies stale too
+            pipe.publish(INVALIDATION_CHANNEL, self._invalidation_message(keys=[key]))
+        return (await pipe.execute())[0]
+
+    async def _delete_batch(self, keys: List[str]) -> int:
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.delete(*keys)
+        if self.local_cache is not None:
+            keys = _key_names(keys)
+            self.local_cache.delete(keys)
+            pipe.publish(INVALIDATION_CHANNEL, self._invalidation_message(keys=keys))
+        return (await pipe.execute())[0]
+
+    @_timed("delete_pattern")
+    async def delete_pattern(self, pattern: str) -> int:
+        """Delete keys matching ``pattern`` using incremental SCAN, never KEYS."""
+        message = self._l1_delete_pattern(pattern)
+        if not self._acquire():
             return 0
+        start = time.perf_counter()
+        deleted = 0
+        try:
+            batch = []
+            async for key in self.redis_client.scan_iter(match=pattern, count=INVALIDATION_BATCH_SIZE):
+                batch.append(key)
+                if len(batch) >= INVALIDATION_BATCH_SIZE:
+                    deleted += await self.redis_client.delete(*batch)
+                    batch = []
+            if batch:
+                deleted += await self.redis_client.delete(*batch)
+            if message is not None:
+                await self.redis_client.publish(INVALIDATION_CHANNEL, message)
+            self.breaker.record_success()
+            self._record_invalidation("pattern", pattern, deleted, time.perf_counter() - start)
+            return deleted
         except Exception as e:
+            self._record_error(e)
             logger.error(f"Redis delete pattern error: {e}")
+            return deleted
+
+    @_timed("invalidate_tags")
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Delete every key registered under ``tags``, in pipelined batches."""
+        if not self._acquire():
             return 0
+        start = time.perf_counter()
+        deleted = 0
+        try:
+            for tag in tags:
+                # SPOP drains the tag set as we go, so keys tagged while we
+                # are deleting are picked up by the same loop
+                while True:
+                    keys = await self.redis_client.spop(tag_key(tag), INVALIDATION_BATCH_SIZE)
+                    if not keys:
+                        break
+                    deleted += await self._delete_batch(keys)
+            self.breaker.record_success()
+            self._record_invalidation("tags", ",".join(tags), deleted, time.perf_counter() - start)
+            return deleted
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Redis tag invalidation error: {e}")
+            return deleted
+
+    @_timed("get_raw")
+    async def get_raw(self, key: str) -> Optional[str]:
+        """Like get() but returns the stored string without deserializing it."""
+        value = self._l1_get(key)
+        if value is not _MISSING:
+            return value
+        if not self._acquire():
+            return None
+        try:
+            data = await self.redis_client.get(key)
+            self.breaker.record_success()
+            if data is None:
+                self._count("misses")
+                return None
+            self._count("hits")
+            text = self.codec.decode_text(data)
+            self._l1_set(key, text, len(data))
+            return text
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Redis get error: {e}")
+            return None
+
+    @_timed("set_raw")
+    async def set_raw(self, key: str, data: str, expire: int = 3600, tags: Sequence[str] = ()) -> bool:
+        if not self._acquire():
+            return False
+        try:
+            encoded = self.codec.encode_text(data)
+            result = await self._setex(key, expire, encoded, tags)
+            self.breaker.record_success()
+            self._l1_set(key, data, len(encoded), expire)
+            return result
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Redis set error: {e}")
+            return False
+
+    @_timed("get_blob")
+    async def get_blob(self, key: str) -> Optional[bytes]:
+        """Bytes stored with set_blob(), returned exactly as written."""
+        value = self._l1_get(key)
+        if value is not _MISSING:
+            return value
+        if not self._acquire():
+            return None
+        try:
+            data = await self.redis_client.get(key)
+            self.breaker.record_success()
+            if data is None:
+                self._count("misses")
+                return None
+            self._count("hits")
+            self._l1_set(key, data, len(data))
+            return data
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Redis get error: {e}")
+            return None
+
+    @_timed("set_blob")
+    async def set_blob(self, key: str, data: bytes, expire: int = 3600, tags: Sequence[str] = ()) -> bool:
+        """Store bytes verbatim, bypassing the codec (e.g. an already-compressed body)."""
+        if not self._acquire():
+            return False
+        try:
+            result = await self._setex(key, expire, data, tags)
+            self.breaker.record_success()
+            self._l1_set(key, data, len(data), expire)
+            return result
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Redis set error: {e}")
+            return False
+
+    @_timed("get_counter")
+    async def get_counter(self, key: str) -> Optional[int]:
+        """Read a version counter, seeding it if missing; bypasses the L1 cache."""
+        if not self._acquire():
+            return None
+        try:
+            value = await self.redis_client.get(key)
+            if value is None:
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.set(key, _counter_seed(), nx=True)
+                pipe.get(key)
+                value = (await pipe.execute())[1]
+            self.breaker.record_success()
+            return int(value)
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Redis counter error: {e}")
+            return None
+
+    @_timed("bump_counter")
+    async def bump_counter(self, key: str) -> Optional[int]:
+        if not self._acquire():
+            return None
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.set(key, _counter_seed(), nx=True)
+            pipe.incr(key)
+            value = (await pipe.execute())[1]
+            self.breaker.record_success()
+            return value
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Redis counter error: {e}")
+            return None
+
+    @_timed("acquire_lock")
+    async def acquire_lock(self, name: str, token: str, lease_ms: int) -> Optional[bool]:
+        """Try to take a short-lived lock; returns None when Redis is unavailable."""
+        if not self._acquire():
+            return None
+        try:
+            result = bool(await self.redis_client.set(name, token, nx=True, px=lease_ms))
+            self.breaker.record_success()
+            return result
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Redis lock error: {e}")
+            return None
+
+    @_timed("release_lock")
+    async def release_lock(self, name: str, token: str) -> bool:
+        if not self._acquire():
+            return False
+        try:
+            result = bool(await self.redis_client.eval(RELEASE_LOCK_SCRIPT, 1, name, token))
+            self.breaker.record_success()
+            return result
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Redis unlock error: {e}")
+            return False
+
+    @_timed("run_script")
+    async def run_script(self, script: str, keys: Sequence[str], args: Sequence[Any] = ()) -> Any:
+        """EVAL a Lua script; returns None when Redis is unavailable or the script fails."""
+        if not self._acquire():
+            return None
+        try:
+            result = await self.redis_client.eval(script, len(keys), *keys, *args)
+            self.breaker.record_success()
+            return result
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Redis script error: {e}")
+            return None
+
+    @_timed("publish")
+    async def publish(self, channel: str, message: str) -> bool:
+        if not self._acquire():
+            return False
+        try:
+            await self.redis_client.publish(channel, message)
+            self.breaker.record_success()
+            return True
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Redis publish error: {e}")
+            return False
 
-# Global Redis client instance
-redis_client = RedisClient()
+# Global Redis client instances
+async_redis_client = AsyncRedisClient()
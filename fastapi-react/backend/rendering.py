@@ -0,0 +1,92 @@
+import gzip
+import json
+import os
+from typing import Any, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; pydantic's encoder is the fallback
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip is offered
+    brotli = None
+
+JSON_MEDIA_TYPE = "application/json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Content codings offered for cached responses, in order of preference
+# (empty disables compression)
+RESPONSE_COMPRESSION = [
+    encoding.strip() for encoding in os.getenv("RESPONSE_COMPRESSION", "br,gzip").split(",")
+    if encoding.strip() and (encoding.strip() != "br" or brotli is not None)
+]
+# Bodies smaller than this are sent uncompressed: the saving is lost in the headers
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+# Compression runs once per cache fill, but a fill is still a user's request:
+# on the catalogue JSON higher settings cost several times the CPU for <2%
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+
+def render_model(model: BaseModel) -> bytes:
+    """Encode ``model`` exactly as FastAPI would for ``response_model=type(model)``.
+
+    Used on cache fills so hits can return the stored body as-is, skipping
+    model construction, validation and serialization.
+    """
+    if orjson is not None:
+        return orjson.dumps(model.model_dump(mode="json"))
+    return model.model_dump_json().encode("utf-8")
+
+def render_json(value: Any) -> bytes:
+    """Compact JSON for plain dicts/lists that already match the response schema."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def negotiate_encoding(accept_encoding: Optional[str], offered: List[str] = RESPONSE_COMPRESSION) -> Optional[str]:
+    """The offered content coding the client prefers, or None for identity.
+
+    Follows the q-values in ``Accept-Encoding``; ties go to the order of
+    ``offered``, and ``*`` stands for any coding not listed explicitly.
+    """
+    if not accept_encoding or not offered:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in offered:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def compress_body(body: bytes, encoding: str) -> Tuple[Optional[str], bytes]:
+    """Encode ``body`` with ``encoding``; returns ``(content_encoding, payload)``.
+
+    Small bodies, and bodies that don't shrink, come back as ``(None, body)``.
+    """
+    if len(body) < RESPONSE_COMPRESSION_MIN_BYTES:
+        return None, body
+    if encoding == "br":
+        payload = brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+    elif encoding == "gzip":
+        # mtime=0 keeps the output identical across fills
+        payload = gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+    else:
+        raise ValueError(f"Unsupported content encoding: {encoding}")
+    if len(payload) >= len(body):
+        return None, body
+    return encoding, payload
@@ -0,0 +1,52 @@
+"""Where a worker's cold start goes, served at GET /stats/startup.
+
+Phases may overlap (Redis and the database are initialised concurrently),
+so their durations don't add up to ``total_ms``.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class StartupTimer:
+    def __init__(self):
+        self.imports_ms: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.notes: Dict[str, str] = {}
+        self._started: Optional[float] = None
+        self.total_ms: Optional[float] = None
+
+    def imports_done(self, started: float):
+        """Record the time spent importing, measured from ``started`` (a perf_counter value)."""
+        self._started = started
+        self.imports_ms = (time.perf_counter() - started) * 1000
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (time.perf_counter() - start) * 1000
+
+    def note(self, name: str, value: str):
+        self.notes[name] = value
+
+    def ready(self):
+        if self._started is not None:
+            self.total_ms = (time.perf_counter() - self._started) * 1000
+        breakdown = ", ".join(f"{name} {ms:.1f}ms" for name, ms in self.phases.items())
+        total = f"{self.total_ms:.1f}ms" if self.total_ms is not None else "?"
+        logger.info(f"🚀 Worker ready in {total} (imports {self.imports_ms or 0:.1f}ms, {breakdown})")
+
+    def stats(self) -> dict:
+        return {
+            "total_ms": self.total_ms,
+            "imports_ms": self.imports_ms,
+            "phases_ms": self.phases,
+            **self.notes,
+        }
+
+startup_timer = StartupTimer()
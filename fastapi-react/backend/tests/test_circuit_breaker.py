@@ -0,0 +1,58 @@
+import time
+
+from circuit_breaker import CircuitBreaker
+
+
+def open_breaker(**kwargs) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_threshold=2, **kwargs)
+    for _ in range(2):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def expire(breaker: CircuitBreaker):
+    breaker._opened_at = time.monotonic() - breaker.probe_interval
+
+
+def test_opens_after_consecutive_failures_only():
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert breaker.counters["rejected"] == 1
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = open_breaker(success_threshold=1)
+    expire(breaker)
+    assert breaker.admit() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.admit() is None
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.admit() is False
+    assert breaker.transitions == {"closed->open": 1, "open->half_open": 1, "half_open->closed": 1}
+
+
+def test_failed_probe_reopens():
+    breaker = open_breaker()
+    expire(breaker)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_released_probe_frees_the_slot():
+    breaker = open_breaker()
+    expire(breaker)
+    assert breaker.admit() is True
+    # e.g. the probe's caller was cancelled before an outcome
+    breaker.release()
+    assert breaker.admit() is True
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from redis_client import AsyncRedisClient
+from write_through import WriteThroughIndex
+
+
+def make_index() -> WriteThroughIndex:
+    client = AsyncRedisClient()
+    client.redis_client = fakeredis.FakeAsyncRedis()
+    return WriteThroughIndex("fruits", client=client)
+
+
+def test_load_loses_to_a_concurrent_patch():
+    async def run():
+        index = make_index()
+
+        async def load_racing_a_write():
+            # A write commits and patches while the snapshot is being read
+            await index.upsert(1, 2, {"name": "apple", "category": "new"})
+            return [(1, 1, {"name": "apple", "category": "old"})]
+
+        # The caller still gets its load, but it isn't installed over the write
+        assert await index.all(load_racing_a_write) == [(1, {"name": "apple", "category": "old"})]
+        assert index.counters["lost_loads"] == 1
+        assert await index.page(None, 10) is None
+
+        async def load():
+            return [(1, 2, {"name": "apple", "category": "new"}), (2, 1, {"name": "kiwi", "category": None})]
+
+        assert await index.all(load) == [(1, {"name": "apple", "category": "new"}), (2, {"name": "kiwi", "category": None})]
+        assert index.counters["loads"] == 2
+        # Installed: served from Redis from now on
+        assert await index.page(1, 10) == [(2, {"name": "kiwi", "category": None})]
+        await index.all(load)
+        assert index.counters["loads"] == 2
+
+    asyncio.run(run())
+
+
+def test_patch_keeps_the_newest_version():
+    async def run():
+        index = make_index()
+
+        async def load():
+            return [(1, 3, {"name": "apple", "category": "c"})]
+
+        await index.all(load)
+        # A writer finishing late with an older version changes nothing
+        assert await index.upsert(1, 2, {"name": "apple", "category": "b"}) is False
+        assert await index.upsert(1, 4, {"name": "apple", "category": "d"}) is True
+        assert await index.remove(1, 4) is False
+        assert await index.all(load) == [(1, {"name": "apple", "category": "d"})]
+        assert await index.remove(1, 5) is True
+        assert await index.all(load) == []
+
+    asyncio.run(run())
@@ -0,0 +1,126 @@
+"""Coalesces writes from concurrent requests into batched transactions.
+
+Requests ``submit()`` a write and wait for its result. The first write
+queued starts a short timer; when it fires, or as soon as
+WRITE_BATCH_MAX_SIZE writes are waiting, the queue is applied in one call
+(one transaction, one fsync) and the ``after`` hook runs once for the
+whole batch (one cache invalidation). Each caller then gets its own
+result or exception, so one bad write doesn't fail its neighbours.
+
+Batches are applied one at a time, in arrival order.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from env import env_flag
+
+logger = logging.getLogger(__name__)
+
+WRITE_BATCHING = env_flag("WRITE_BATCHING")
+WRITE_BATCH_MAX_SIZE = int(os.getenv("WRITE_BATCH_MAX_SIZE", "64"))
+# Longest a write waits for others to join its batch
+WRITE_BATCH_MAX_DELAY_MS = float(os.getenv("WRITE_BATCH_MAX_DELAY_MS", "5"))
+
+# Applies a batch (in the threadpool); returns one result or exception per write
+BatchApplier = Callable[[List[Any]], List[Any]]
+# Runs once per batch with the (write, result) pairs that succeeded
+AfterBatch = Callable[[List[Tuple[Any, Any]]], Awaitable[None]]
+
+class WriteBatcher:
+    def __init__(self, apply: BatchApplier, after: AfterBatch, max_size: int = WRITE_BATCH_MAX_SIZE, max_delay_ms: float = WRITE_BATCH_MAX_DELAY_MS):
+        self.apply = apply
+        self.after = after
+        self.max_size = max_size
+        self.max_delay = max_delay_ms / 1000
+        self._queue: List[Tuple[Any, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._lock = asyncio.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+        self.counters = {
+            "batches": 0,
+            "writes": 0,
+            "failed_writes": 0,
+            "failed_batches": 0,
+            "max_batch_size": 0,
+            "flushed_on_size": 0,
+            "flushed_on_timer": 0,
+            "queue_wait_seconds": 0.0,
+            "apply_seconds": 0.0,
+        }
+
+    async def submit(self, write: Any) -> Any:
+        """Queue ``write`` and return its result once its batch is committed."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((write, future, time.perf_counter()))
+        if len(self._queue) >= self.max_size:
+            self._flush("size")
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._flush, "timer")
+        # Shielded: a client disconnecting doesn't take the write back
+        return await asyncio.shield(future)
+
+    def _flush(self, reason: str):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._queue = self._queue, []
+        if not batch:
+            return
+        self.counters[f"flushed_on_{reason}"] += 1
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future, float]]):
+        async with self._lock:
+            start = time.perf_counter()
+            writes = [write for write, _, _ in batch]
+            try:
+                results = await run_in_threadpool(self.apply, writes)
+            except Exception as e:
+                # The transaction itself failed: nothing in the batch was written
+                logger.error(f"❌ Write batch of {len(batch)} failed: {e}")
+                self.counters["failed_batches"] += 1
+                results = [e] * len(batch)
+            applied = time.perf_counter()
+
+            done = [(write, result) for write, result in zip(writes, results) if not isinstance(result, Exception)]
+            if done:
+                try:
+                    await self.after(done)
+                except Exception as e:
+                    logger.error(f"After-batch hook failed: {e}")
+
+            self.counters["batches"] += 1
+            self.counters["writes"] += len(batch)
+            self.counters["failed_writes"] += len(batch) - len(done)
+            self.counters["max_batch_size"] = max(self.counters["max_batch_size"], len(batch))
+            self.counters["queue_wait_seconds"] += sum(start - queued for _, _, queued in batch)
+            self.counters["apply_seconds"] += applied - start
+            logger.info(f"📦 Applied {len(batch)} writes in one batch ({(applied - start) * 1000:.2f}ms)")
+
+            for (_, future, _), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def stats(self) -> dict:
+        batches, writes = self.counters["batches"], self.counters["writes"]
+        return {
+            "enabled": True,
+            "max_size": self.max_size,
+            "max_delay_ms": self.max_delay * 1000,
+            "queued": len(self._queue),
+            **self.counters,
+            "avg_batch_size": writes / batches if batches else 0.0,
+            "avg_queue_wait_ms": self.counters["queue_wait_seconds"] / writes * 1000 if writes else 0.0,
+            "avg_apply_ms": self.counters["apply_seconds"] / batches * 1000 if batches else 0.0,
+        }
@@ -0,0 +1,205 @@
+"""Redis copy of a table that writes patch in place instead of deleting.
+
+``<name>:by_id`` is a hash of ``id -> "<version>|<json>"`` (an empty json
+marks a deleted row) and ``<name>:ids`` a sorted set of the live ids, so
+pages can be read in id order. ``<name>:complete`` is only present while
+the hash holds the whole table; without it reads fall back to the database
+and writes don't patch.
+
+Ordering guarantees:
+
+* A patch is applied only if its row version is newer than the stored one,
+  so two writers finishing out of order can't leave the older row behind.
+* Every patch bumps ``<name>:generation`` in the same script. A full load
+  records the generation before querying and is only installed if it is
+  unchanged, so a write that lands during the load can't be overwritten by
+  the older snapshot.
+"""
+import json
+import logging
+import os
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from env import env_flag
+from redis_client import async_redis_client
+
+logger = logging.getLogger(__name__)
+
+CACHE_WRITE_THROUGH = env_flag("CACHE_WRITE_THROUGH")
+# Upper bound on how long a copy that missed a patch (e.g. Redis was down
+# mid-write) can be served
+CACHE_WRITE_THROUGH_TTL = int(os.getenv("CACHE_WRITE_THROUGH_TTL", "3600"))
+# Rows sent per script call while staging a full load
+STAGE_BATCH_SIZE = 1000
+STAGE_TTL = 300
+
+# KEYS: hash, ids, complete, generation  ARGV: id, version, json ("" to delete)
+PATCH_SCRIPT = """
+redis.call("incr", KEYS[4])
+if redis.call("exists", KEYS[3]) == 0 then
+    return 0
+end
+local current = redis.call("hget", KEYS[1], ARGV[1])
+if current and tonumber(string.match(current, "^(%d+)|")) >= tonumber(ARGV[2]) then
+    return -1
+end
+redis.call("hset", KEYS[1], ARGV[1], ARGV[2] .. "|" .. ARGV[3])
+if ARGV[3] == "" then
+    redis.call("zrem", KEYS[2], ARGV[1])
+else
+    redis.call("zadd", KEYS[2], ARGV[1], ARGV[1])
+end
+return 1
+"""
+
+# KEYS: staging hash, staging ids  ARGV: ttl, then id, version, json triples
+STAGE_SCRIPT = """
+for i = 2, #ARGV, 3 do
+    redis.call("hset", KEYS[1], ARGV[i], ARGV[i + 1] .. "|" .. ARGV[i + 2])
+    redis.call("zadd", KEYS[2], ARGV[i], ARGV[i])
+end
+redis.call("expire", KEYS[1], ARGV[1])
+redis.call("expire", KEYS[2], ARGV[1])
+return 1
+"""
+
+# KEYS: hash, ids, complete, generation, staging hash, staging ids
+# ARGV: generation seen before the load, ttl
+INSTALL_SCRIPT = """
+if redis.call("get", KEYS[4]) ~= ARGV[1] then
+    redis.call("del", KEYS[5], KEYS[6])
+    return 0
+end
+redis.call("del", KEYS[1], KEYS[2])
+if redis.call("exists", KEYS[5]) == 1 then
+    redis.call("rename", KEYS[5], KEYS[1])
+    redis.call("rename", KEYS[6], KEYS[2])
+    redis.call("expire", KEYS[1], ARGV[2])
+    redis.call("expire", KEYS[2], ARGV[2])
+end
+redis.call("set", KEYS[3], "1", "ex", ARGV[2])
+return 1
+"""
+
+# KEYS: hash, complete
+READ_ALL_SCRIPT = """
+if redis.call("exists", KEYS[2]) == 0 then
+    return false
+end
+return redis.call("hgetall", KEYS[1])
+"""
+
+# KEYS: hash, ids, complete  ARGV: min score, limit
+READ_PAGE_SCRIPT = """
+if redis.call("exists", KEYS[3]) == 0 then
+    return false
+end
+local ids = redis.call("zrangebyscore", KEYS[2], ARGV[1], "+inf", "LIMIT", 0, ARGV[2])
+if #ids == 0 then
+    return {}
+end
+return {ids, redis.call("hmget", KEYS[1], unpack(ids))}
+"""
+
+# KEYS: hash, ids, complete, generation
+RESET_SCRIPT = """
+redis.call("incr", KEYS[4])
+return redis.call("del", KEYS[1], KEYS[2], KEYS[3])
+"""
+
+Record = Tuple[int, Dict[str, Any]]
+Loader = Callable[[], Awaitable[List[Tuple[int, int, Dict[str, Any]]]]]
+
+def _decode(value: bytes) -> Tuple[int, Optional[Dict[str, Any]]]:
+    version, _, payload = value.partition(b"|")
+    return int(version), json.loads(payload) if payload else None
+
+class WriteThroughIndex:
+    """A table mirrored into Redis and patched by every write."""
+
+    def __init__(self, name: str, client=async_redis_client, ttl: int = CACHE_WRITE_THROUGH_TTL):
+        self.client = client
+        self.ttl = ttl
+        self.hash_key = f"{name}:by_id"
+        self.ids_key = f"{name}:ids"
+        self.complete_key = f"{name}:complete"
+        self.generation_key = f"{name}:generation"
+        self.counters = {"reads": 0, "loads": 0, "patches": 0, "stale_patches": 0, "skipped_patches": 0, "lost_loads": 0}
+
+    @property
+    def _keys(self) -> List[str]:
+        return [self.hash_key, self.ids_key, self.complete_key, self.generation_key]
+
+    async def _patch(self, record_id: int, version: int, payload: str) -> bool:
+        result = await self.client.run_script(PATCH_SCRIPT, self._keys, [record_id, version, payload])
+        if result is None:
+            # Redis failed mid-write: drop the copy rather than risk serving it stale
+            logger.warning(f"⚠️ Write-through patch of {self.hash_key}[{record_id}] failed - resetting")
+            await self.reset()
+            return False
+        self.counters[{1: "patches", -1: "stale_patches"}.get(result, "skipped_patches")] += 1
+        return result == 1
+
+    async def upsert(self, record_id: int, version: int, record: Dict[str, Any]) -> bool:
+        return await self._patch(record_id, version, json.dumps(record))
+
+    async def remove(self, record_id: int, version: int) -> bool:
+        """Record a deletion; ``version`` must be newer than the row's last write."""
+        return await self._patch(record_id, version, "")
+
+    async def reset(self):
+        await self.client.run_script(RESET_SCRIPT, self._keys)
+
+    async def _install(self, generation: int, rows: List[Tuple[int, int, Dict[str, Any]]]) -> bool:
+        token = uuid.uuid4().hex
+        staging = [f"{self.hash_key}:staging:{token}", f"{self.ids_key}:staging:{token}"]
+        for start in range(0, len(rows), STAGE_BATCH_SIZE):
+            args: List[Any] = [STAGE_TTL]
+            for record_id, version, record in rows[start:start + STAGE_BATCH_SIZE]:
+                args.extend((record_id, version, json.dumps(record)))
+            if await self.client.run_script(STAGE_SCRIPT, staging, args) is None:
+                return False
+        installed = await self.client.run_script(INSTALL_SCRIPT, self._keys + staging, [generation, self.ttl])
+        if installed == 0:
+            self.counters["lost_loads"] += 1
+            logger.info(f"♻️ {self.hash_key} changed while loading - not installed")
+        return bool(installed)
+
+    async def all(self, load: Loader) -> List[Record]:
+        """Every live record in id order, loading (and installing) the table if needed."""
+        entries = await self.client.run_script(READ_ALL_SCRIPT, [self.hash_key, self.complete_key])
+        if entries is not None:
+            self.counters["reads"] += 1
+            records = []
+            for i in range(0, len(entries), 2):
+                _, record = _decode(entries[i + 1])
+                if record is not None:
+                    records.append((int(entries[i]), record))
+            records.sort(key=lambda item: item[0])
+            return records
+
+        self.counters["loads"] += 1
+        generation = await self.client.get_counter(self.generation_key)
+        rows = await load()
+        if generation is not None:
+            await self._install(generation, rows)
+        return [(record_id, record) for record_id, _, record in rows]
+
+    async def page(self, after: Optional[int], limit: int) -> Optional[List[Record]]:
+        """Up to ``limit`` records with id > ``after``; None when the copy is incomplete."""
+        result = await self.client.run_script(
+            READ_PAGE_SCRIPT,
+            [self.hash_key, self.ids_key, self.complete_key],
+            ["-inf" if after is None else f"({after}", limit],
+        )
+        if result is None:
+            return None
+        self.counters["reads"] += 1
+        if not result:
+            return []
+        ids, values = result
+        return [(int(record_id), _decode(value)[1]) for record_id, value in zip(ids, values) if value is not None]
+
+    def stats(self) -> dict:
+        return {"hash": self.hash_key, "ttl": self.ttl, **self.counters}
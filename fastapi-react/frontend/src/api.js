@@ -2,8 +2,44 @@ import axios from 'axios';
 
 // Create an instance of axios with the base URL
 const api = axios.create({
-  baseURL: "http://localhost:8000"
+  baseURL: "http://localhost:8000",
+  // Send cookies back, so reads after a write are pinned to the primary (db_pin)
+  withCredentials: true,
+  // 304 Not Modified is a successful revalidation, not an error
+  validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+});
+
+// Last ETag and body seen per GET url, used to revalidate with If-None-Match
+const etagCache = new Map();
+
+const cacheKey = (config) => api.getUri(config);
+
+api.interceptors.request.use((config) => {
+  if ((config.method || 'get').toLowerCase() === 'get') {
+    const cached = etagCache.get(cacheKey(config));
+    if (cached) {
+      config.headers['If-None-Match'] = cached.etag;
+    }
+  }
+  return config;
+});
+
+api.interceptors.response.use((response) => {
+  if ((response.config.method || 'get').toLowerCase() !== 'get') {
+    return response;
+  }
+  const key = cacheKey(response.config);
+  if (response.status === 304) {
+    // Nothing changed on the server: hand back the body we already have
+    const cached = etagCache.get(key);
+    return { ...response, status: 200, data: cached ? cached.data : response.data };
+  }
+  const etag = response.headers.etag;
+  if (etag) {
+    etagCache.set(key, { etag, data: response.data });
+  }
+  return response;
 });
 
 // Export the Axios instance
-export default api;
\ No newline at end of file
+export default api;
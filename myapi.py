@@ -1,49 +1,63 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Path
 from typing import Optional
 from pydantic import BaseModel
+from student_store import StudentStore
+from student_persistence import StudentPersistence
 
-app = FastAPI() 
+# Opt-in: keep students across restarts in this directory
+STUDENTS_DATA_DIR = os.getenv("STUDENTS_DATA_DIR")
+
+persistence = StudentPersistence(STUDENTS_DATA_DIR) if STUDENTS_DATA_DIR else None
+students = persistence.open() if persistence else StudentStore()
+if not len(students):
+    students.create(1, name="John", age=22, class_name="Computer year 12")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if persistence:
+        # Lets the log writer finish its last group commit
+        persistence.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # I Want to create CRUD endpoints for a resource called "Item".
 
-students={
-    1:{
-        "name":"John",
-        "age":22,
-        "class":"Computer year 12"
-    }
-}
 @app.get("/")
 def index():
     return {"message": "Welcome to the Item API"}
 
 @app.get("/students")
 def get_students():
-    return students
+    return {student_id: record.to_dict() for student_id, record in students.all().items()}
 
 @app.get("/students/{student_id}")
 def get_student(student_id: int = Path(..., title="The ID of the student to get", gt=0)):
-    if student_id not in students:
+    record = students.get(student_id)
+    if record is None:
         return {"error": "Student not found"}
-    return students[student_id]  
+    return record.to_dict()
 
 # query parameters
 @app.get("/get-by-name")
 def get_student_by_name(name: Optional[str] = None):
-    for student_id in students:
-        if students[student_id]["name"] == name:
-            return students[student_id]
-    return {"error": "Student not found"}
+    record = students.get_by_name(name)
+    if record is None:
+        return {"error": "Student not found"}
+    return record.to_dict()
 
 
 # combined path and query parameters
 
 @app.get("/get-student/{student_id}")
 def get_student(student_id: int, name: Optional[str] = None):
-    if student_id not in students:
+    record = students.get(student_id)
+    if record is None:
         return {"error": "Student id not found"}
-    if students[student_id]["name"] == name:
-        return students[student_id]
+    if record.name == name:
+        return record.to_dict()
     return {"error": "Student name not found"}
 
 
@@ -55,35 +69,32 @@ class Student(BaseModel):
 
 @app.post("/create-student/{student_id}")
 def create_student(student_id: int, student: Student):
-    if student_id in students:
+    record = students.create(student_id, student.name, student.age, student.class_name)
+    if record is None:
         return {"error": "Student already exists"}
-    students[student_id] = {
-        "name": student.name,
-        "age": student.age,
-        "class": student.class_name
-    }
-    return students[student_id]   
+    return record.to_dict()
 
 # put method to update a student
 @app.put("/update-student/{student_id}")
 def update_student(student_id: int, student: Student):
-    if student_id not in students:
+    record = students.update(student_id, student.name, student.age, student.class_name)
+    if record is None:
         return {"error": "Student not found"}
-    students[student_id] = {
-        "name": student.name,
-        "age": student.age,
-        "class": student.class_name
-    }
-    return students[student_id]   
+    return record.to_dict()
 
 # delete method to delete a student
 @app.delete("/delete-student/{student_id}")
 def delete_student(student_id: int):
-    if student_id not in students:
+    if not students.delete(student_id):
         return {"error": "Student not found"}
-    del students[student_id]
     return {"message": "Student deleted successfully"}
 
+@app.get("/stats/students")
+def students_stats():
+    if persistence is None:
+        return {"persistence": False, "students": len(students)}
+    return {"persistence": True, **persistence.stats()}
+
 @app.get("/about")
 def about():
     return {"message": "This is a simple API to manage students."}
\ No newline at end of file
@@ -0,0 +1,278 @@
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Iterator, Optional, Union
+
+
+class StudentRecord:
+    # __slots__ drops the per-instance __dict__, which is most of the memory
+    # a small record costs when there are millions of them
+    __slots__ = ("name", "age", "class_name")
+
+    def __init__(self, name: str, age: int, class_name: str):
+        self.name = name
+        self.age = age
+        self.class_name = class_name
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "age": self.age, "class": self.class_name}
+
+
+_MISSING = object()
+
+# A name held by one student maps to its id; a repeated name to an
+# insertion-ordered dict of ids (oldest first), so adding or removing one is
+# O(1) however many students share the name
+NameIds = Union[int, Dict[int, None]]
+
+
+def _add_id(index: Dict[str, NameIds], name: str, student_id: int):
+    ids = index.get(name)
+    if ids is None:
+        index[name] = student_id
+    elif type(ids) is int:
+        if ids != student_id:
+            # Published as a new object: readers never see it half-built
+            index[name] = {ids: None, student_id: None}
+    else:
+        ids[student_id] = None
+
+
+def _discard_id(index: Dict[str, NameIds], name: str, student_id: int):
+    ids = index.get(name)
+    if type(ids) is int:
+        if ids == student_id:
+            del index[name]
+    elif ids is not None:
+        ids.pop(student_id, None)
+        if len(ids) == 1:
+            index[name] = next(iter(ids))
+
+
+class StudentStore:
+    """In-memory students keyed by id, with a secondary index on name.
+
+    Writes take a lock so the id map and the name index change together.
+    Reads take no lock: records are never modified in place (an update
+    swaps in a new record), and a reader walking the ids of a repeated name
+    while a write changes them starts over under the lock.
+
+    ``base`` is an optional read-only snapshot (see student_persistence)
+    that the store overlays: changes since the snapshot live in
+    ``_records``, where None marks a snapshot row that was deleted.
+    ``journal`` receives every write. A journaled write is held back until
+    its commit is durable and only then applied, so readers never see a
+    write that could still be lost; writes are applied in log order.
+    """
+
+    def __init__(self, base=None, journal=None):
+        self._base = base
+        self._records: Dict[int, Optional[StudentRecord]] = {}
+        # Names aren't unique: each maps to the ids holding it, oldest first
+        self._by_name: Dict[str, NameIds] = {}
+        self._count = len(base) if base is not None else 0
+        self.journal = journal
+        # Journaled writes waiting for their commit, in log order: (id, record
+        # or None for a delete, commit)
+        self._pending: Deque[tuple] = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, student_id: int) -> bool:
+        return self.get(student_id) is not None
+
+    def overlay_size(self) -> int:
+        """Students held in memory on top of the snapshot."""
+        return len(self._records)
+
+    def get(self, student_id: int) -> Optional[StudentRecord]:
+        record = self._records.get(student_id, _MISSING)
+        if record is _MISSING:
+            return self._base.get(student_id) if self._base is not None else None
+        return record
+
+    def get_by_name(self, name: str) -> Optional[StudentRecord]:
+        if self._base is not None:
+            for student_id in self._base.ids_named(name):
+                # Rows changed since the snapshot are answered by the overlay
+                if student_id not in self._records:
+                    return self._base.get(student_id)
+        for student_id in self._ids_named(name):
+            record = self._records.get(student_id)
+            # The id may have been deleted since we read the index
+            if record is not None and record.name == name:
+                return record
+        return None
+
+    def all(self) -> Dict[int, StudentRecord]:
+        # dict.copy() runs without releasing the GIL, so this is a consistent snapshot
+        overlay = self._records.copy()
+        records = {}
+        if self._base is not None:
+            records.update((student_id, record) for student_id, record in self._base.items() if student_id not in overlay)
+        records.update((student_id, record) for student_id, record in overlay.items() if record is not None)
+        return records
+
+    def _ids_named(self, name: str) -> Iterator[int]:
+        ids = self._by_name.get(name)
+        if ids is None:
+            return
+        if type(ids) is int:
+            yield ids
+            return
+        try:
+            yield from ids
+        except RuntimeError:
+            # Resized by a write mid-walk: go again over a copy taken under
+            # the lock (ids seen twice are harmless, callers stop at a match)
+            with self._lock:
+                ids = self._by_name.get(name)
+                ids = (ids,) if type(ids) is int else list(ids or ())
+            yield from ids
+
+    def _index(self, name: str, student_id: int):
+        _add_id(self._by_name, name, student_id)
+
+    def _unindex(self, name: str, student_id: int):
+        _discard_id(self._by_name, name, student_id)
+
+    def _set(self, student_id: int, record: StudentRecord):
+        previous = self._records.get(student_id)
+        if previous is not None:
+            self._unindex(previous.name, student_id)
+        elif self.get(student_id) is None:
+            self._count += 1
+        self._records[student_id] = record
+        self._index(record.name, student_id)
+
+    def _remove(self, student_id: int) -> bool:
+        if self.get(student_id) is None:
+            return False
+        previous = self._records.pop(student_id, None)
+        if previous is not None:
+            self._unindex(previous.name, student_id)
+        if self._base is not None and self._base.get(student_id) is not None:
+            self._records[student_id] = None
+        self._count -= 1
+        return True
+
+    def restore_put(self, student_id: int, record: StudentRecord):
+        """Apply a logged write while loading; not journaled."""
+        with self._lock:
+            self._set(student_id, record)
+
+    def restore_delete(self, student_id: int):
+        with self._lock:
+            self._remove(student_id)
+
+    def _current(self, student_id: int) -> Optional[StudentRecord]:
+        # What a new write must be checked against: the latest pending write, if any
+        for pending_id, record, _ in reversed(self._pending):
+            if pending_id == student_id:
+                return record
+        return self.get(student_id)
+
+    def _apply(self, student_id: int, record: Optional[StudentRecord]):
+        if record is None:
+            self._remove(student_id)
+        else:
+            self._set(student_id, record)
+
+    def _write(self, student_id: int, record: Optional[StudentRecord]):
+        """Journal a write (called under the lock); returns its commit, or None
+        if there is no journal and the write was applied straight away."""
+        if self.journal is None:
+            self._apply(student_id, record)
+            return None
+        # Queued under the lock so the log order matches the order writes are
+        # applied in; a record the journal can't encode raises here and changes nothing
+        commit = self.journal.put(student_id, record) if record is not None else self.journal.delete(student_id)
+        self._pending.append((student_id, record, commit))
+        return commit
+
+    def _drain(self):
+        # Commits complete in log order, so the finished ones are at the front
+        while self._pending and self._pending[0][2].done:
+            student_id, record, commit = self._pending.popleft()
+            if commit.error is None:
+                self._apply(student_id, record)
+
+    def _wait(self, commit):
+        if commit is None:
+            return
+        try:
+            commit.wait()
+        finally:
+            with self._lock:
+                self._drain()
+
+    def create(self, student_id: int, name: str, age: int, class_name: str) -> Optional[StudentRecord]:
+        """Add a student; returns None if the id is taken."""
+        record = StudentRecord(name, age, class_name)
+        with self._lock:
+            if self._current(student_id) is not None:
+                return None
+            commit = self._write(student_id, record)
+        self._wait(commit)
+        return record
+
+    def update(self, student_id: int, name: str, age: int, class_name: str) -> Optional[StudentRecord]:
+        """Replace a student; returns None if there is no such id."""
+        record = StudentRecord(name, age, class_name)
+        with self._lock:
+            if self._current(student_id) is None:
+                return None
+            commit = self._write(student_id, record)
+        self._wait(commit)
+        return record
+
+    def delete(self, student_id: int) -> bool:
+        with self._lock:
+            if self._current(student_id) is None:
+                return False
+            commit = self._write(student_id, None)
+        self._wait(commit)
+        return True
+
+    def checkpoint(self, rotate: Callable[[], object]) -> tuple:
+        """Run ``rotate`` (switch the journal to a new file) and capture the
+        state it corresponds to, atomically with respect to writes.
+
+        Returns the marker, the base and the changes on top of it, including
+        pending writes: they are in the log before the rotation.
+        """
+        with self._lock:
+            marker = rotate()
+            changes = self._records.copy()
+            for student_id, record, _ in self._pending:
+                changes[student_id] = record
+            return marker, self._base, changes
+
+    def rebase(self, base, covered: Dict[int, Optional[StudentRecord]]):
+        """Swap in ``base``, a snapshot of the old base plus ``covered`` (the
+        changes ``checkpoint`` returned), and drop the overlay entries it now
+        holds. Call once the rotation is durable, so every covered write has
+        finished."""
+        with self._lock:
+            self._drain()
+            records = {}
+            for student_id, record in self._records.items():
+                if covered.get(student_id, _MISSING) is not record:
+                    records[student_id] = record
+            for student_id, record in covered.items():
+                if record is not None and student_id not in self._records:
+                    # Deleted since the checkpoint, but the new base still has it
+                    records[student_id] = None
+                    self._records[student_id] = None
+            by_name: Dict[str, NameIds] = {}
+            for student_id in sorted(records):
+                record = records[student_id]
+                if record is not None:
+                    _add_id(by_name, record.name, student_id)
+            # Readers don't lock: swap the base before trimming the overlay, so
+            # either old or new overlay gives the same answer over it. The old
+            # snapshot is unmapped once the last reader drops it.
+            self._base = base
+            self._records = records
+            self._by_name = by_name
@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+import student_persistence
+from student_persistence import StudentPersistence, encode_put
+from student_store import StudentRecord
+
+
+def open_store(data_dir):
+    persistence = StudentPersistence(str(data_dir), interval=0)
+    return persistence, persistence.open()
+
+
+def state(store) -> dict:
+    return {student_id: record.to_dict() for student_id, record in store.all().items()}
+
+
+def log_files(data_dir) -> list:
+    return sorted(name for name in os.listdir(data_dir) if name.endswith(".log"))
+
+
+def test_replay_stops_at_torn_frame_and_truncates_it(tmp_path):
+    persistence, store = open_store(tmp_path)
+    store.create(1, "alice", 20, "a")
+    store.create(2, "bob", 21, "b")
+    store.update(1, "alice", 22, "c")
+    store.delete(2)
+    expected = state(store)
+    persistence.close()
+
+    [log] = log_files(tmp_path)
+    path = tmp_path / log
+    intact = path.stat().st_size
+    # A crash mid-append: only part of the next frame made it to disk
+    with open(path, "ab") as f:
+        f.write(encode_put(3, StudentRecord("carol", 23, "c"))[:-3])
+
+    persistence, store = open_store(tmp_path)
+    assert state(store) == expected
+    assert path.stat().st_size == intact
+    # Writes after the truncation land on a clean frame boundary and replay
+    store.create(4, "dave", 24, "d")
+    expected = state(store)
+    persistence.close()
+
+    persistence, store = open_store(tmp_path)
+    assert state(store) == expected
+    assert store.get_by_name("dave").age == 24
+    persistence.close()
+
+
+def test_snapshot_and_reopen_round_trip(tmp_path):
+    persistence, store = open_store(tmp_path)
+    for student_id in range(50):
+        store.create(student_id, f"student-{student_id % 10}", student_id, "x")
+    persistence.snapshot()
+    assert store.overlay_size() == 0
+    # Changes on top of the snapshot: updates, deletes and new rows
+    store.update(3, "renamed", 99, "y")
+    store.delete(4)
+    store.create(100, "student-1", 7, "z")
+    expected = state(store)
+    persistence.close()
+
+    persistence, store = open_store(tmp_path)
+    assert state(store) == expected
+    assert len(store) == len(expected)
+    assert store.get(4) is None
+    assert store.get_by_name("renamed").age == 99
+    assert store.get_by_name("student-4").name == "student-4"
+    # A second snapshot folds the log in; the next open has nothing to replay
+    persistence.snapshot()
+    persistence.close()
+    assert len(log_files(tmp_path)) == 1
+
+    persistence, store = open_store(tmp_path)
+    assert state(store) == expected
+    assert persistence.counters["replayed_writes"] == 0
+    persistence.close()
+
+
+def test_failed_fsync_rejects_the_write_and_later_ones(tmp_path, monkeypatch):
+    persistence, store = open_store(tmp_path)
+    store.create(1, "alice", 20, "a")
+    expected = state(store)
+
+    def failing_fsync(fd):
+        raise OSError(5, "EIO")
+
+    monkeypatch.setattr(student_persistence.os, "fsync", failing_fsync)
+    with pytest.raises(OSError):
+        store.create(2, "bob", 21, "b")
+    monkeypatch.undo()
+    assert store.get(2) is None
+    with pytest.raises(RuntimeError):
+        store.create(3, "carol", 22, "c")
+    persistence.close()
+
+    persistence, store = open_store(tmp_path)
+    assert state(store) == expected
+    persistence.close()